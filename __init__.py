@@ -10,9 +10,12 @@ from utils.session import initialize_session_state, process_user_input
 from utils.export import generate_csv, generate_excel, generate_json, generate_pdf
 from utils.file_loader import load_questions, load_instructions, create_directory_structure
 from utils.special_messages import process_special_messages, detect_conversation_loop
-from utils.extract import extract_user_info, multi_answer_detection
+from utils.extract import extract_user_info, extract_user_info_locally, multi_answer_detection
 from utils.email import send_email
-from services.ai_service import initialize_openai_client, get_ai_response
+from services.ai_service import initialize_openai_client, get_openai_client, get_ai_response, stream_ai_response
+from services.resilience import AIServiceError
+from services.rate_limiter import get_rate_limit_stats
+from services.hedging import get_hedge_stats
 from services.summary_service import generate_conversation_summary
 
 __version__ = "1.0.0"
@@ -0,0 +1,441 @@
+"""
+ACME Questionnaire Bot - Turn Latency Benchmark
+
+Drives complete questionnaire sessions headless, the same way the UI does,
+against the fake OpenAI backend and reports per-stage wall time, LLM calls,
+tokens and prompt cache hit rates per call type as JSON for comparison
+between commits.
+
+Usage:
+    python -m benchmarks.turn_latency --sessions 3 --latency 0.3 --output results.json
+    python -m benchmarks.turn_latency --compare before.json after.json
+
+Run from the project root. Streamlit's script runtime is replaced by a small
+shim: session state is a plain attribute dictionary, st.rerun ends the stage
+and UI calls do nothing.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+
+# Answers typed by the simulated respondent, cycled through the questionnaire
+SAMPLE_ANSWERS = [
+    "We use it for daily scheduling and for storm restoration when we bring in outside crews.",
+    "Every day, and several times an hour during major events.",
+    "Supervisors build the assignments in a shared spreadsheet each morning and call the crew leads.",
+    "We need crew members, their qualifications, vehicles, equipment and the work location.",
+    "Our dispatch team reviews open work orders and assigns them based on skills and location.",
+    "Vehicles are assigned to crews at the start of the week and swapped when one is in the shop.",
+    "Mutual assistance crews are requested through our regional group and assigned by the storm desk.",
+    "Contractors are called in from our approved vendor list and tracked in a separate sheet."
+]
+
+class HeadlessSessionState(dict):
+    """Session state for running the app without the Streamlit runtime."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+class RerunRequested(Exception):
+    """Raised by the shimmed st.rerun to end the current stage."""
+
+class HeadlessColumn:
+    """Stand-in for a Streamlit column or placeholder."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+def install_streamlit_shim():
+    """Replace the Streamlit calls the app makes with headless stand-ins."""
+    import streamlit as st
+
+    def rerun(*args, **kwargs):
+        raise RerunRequested()
+
+    def stop(*args, **kwargs):
+        raise RerunRequested()
+
+    for name in ("markdown", "write", "error", "info", "success", "warning", "text_area", "download_button"):
+        setattr(st, name, lambda *args, **kwargs: None)
+    st.button = lambda *args, **kwargs: False
+    st.columns = lambda spec, *args, **kwargs: [HeadlessColumn() for _ in range(spec if isinstance(spec, int) else len(spec))]
+    st.empty = lambda: HeadlessColumn()
+    st.rerun = rerun
+    st.stop = stop
+    st.session_state = HeadlessSessionState()
+
+def get_commit():
+    """
+    Get the current git commit, for labelling results.
+
+    Returns:
+        str: Short commit hash, or 'unknown' outside a git checkout
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def snapshot_usage():
+    """
+    Get the process-wide usage counters.
+
+    Returns:
+        dict: Mapping of call type to counters
+    """
+    from services.usage_stats import get_usage_stats
+    return get_usage_stats()
+
+def usage_delta(before, after):
+    """
+    Get the calls and tokens between two usage snapshots.
+
+    Args:
+        before (dict): Snapshot from snapshot_usage
+        after (dict): Later snapshot from snapshot_usage
+
+    Returns:
+        dict: LLM calls, calls per call type, prompt, cached and completion tokens,
+            and the prompt and cached tokens per call type
+    """
+    delta = {
+        "llm_calls": 0, "calls_by_purpose": {}, "prompt_tokens": 0, "cached_tokens": 0,
+        "completion_tokens": 0, "cache_by_purpose": {}
+    }
+    for purpose, totals in after.items():
+        previous = before.get(purpose, {})
+        calls = totals["calls"] - previous.get("calls", 0)
+        prompt_tokens = totals["prompt_tokens"] - previous.get("prompt_tokens", 0)
+        cached_tokens = totals["cached_tokens"] - previous.get("cached_tokens", 0)
+        if calls:
+            delta["calls_by_purpose"][purpose] = calls
+            delta["cache_by_purpose"][purpose] = {"prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens}
+        delta["llm_calls"] += calls
+        delta["prompt_tokens"] += prompt_tokens
+        delta["cached_tokens"] += cached_tokens
+        delta["completion_tokens"] += totals["completion_tokens"] - previous.get("completion_tokens", 0)
+    return delta
+
+def get_hit_rate(cached_tokens, prompt_tokens):
+    """
+    Get the share of prompt tokens served from the prompt cache.
+
+    Args:
+        cached_tokens (int): Prompt tokens read from the cache
+        prompt_tokens (int): All prompt tokens
+
+    Returns:
+        float: Hit rate between 0 and 1, 0 without prompt tokens
+    """
+    return round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0
+
+def summarize_cache_by_purpose(stages):
+    """
+    Add up the prompt cache counters per call type over stage results.
+
+    Args:
+        stages (list): Stage results from run_stage
+
+    Returns:
+        dict: Per call type, the prompt and cached tokens and the hit rate
+    """
+    by_purpose = {}
+    for stage in stages:
+        for purpose, tokens in stage["cache_by_purpose"].items():
+            totals = by_purpose.setdefault(purpose, {"prompt_tokens": 0, "cached_tokens": 0})
+            totals["prompt_tokens"] += tokens["prompt_tokens"]
+            totals["cached_tokens"] += tokens["cached_tokens"]
+    for totals in by_purpose.values():
+        totals["cache_hit_rate"] = get_hit_rate(totals["cached_tokens"], totals["prompt_tokens"])
+    return by_purpose
+
+def run_stage(stage, action, question_index=None):
+    """
+    Run one user action to completion and measure it.
+
+    A streamed reply is finished the way the next script run would finish it.
+    Background calls the stage started are waited for and applied (untimed), as
+    if the user were reading the reply, so their calls and tokens count towards
+    this stage.
+
+    Args:
+        stage (str): Stage name, e.g. 'answer' or 'help'
+        action (callable): Performs the user action
+        question_index (int): Question the stage belongs to
+
+    Returns:
+        dict: Stage name, question, wall time, time to first streamed text, LLM calls and tokens
+    """
+    import streamlit as st
+    from services.turn_pipeline import wait_for_pending_calls
+    from utils.session import complete_pending_response, apply_background_results, handle_due_summary_request
+
+    before = snapshot_usage()
+    first_text = []
+    started = time.perf_counter()
+
+    try:
+        action()
+    except RerunRequested:
+        pass
+
+    if st.session_state.get("pending_response"):
+        def render(text):
+            if not first_text:
+                first_text.append(time.perf_counter() - started)
+        try:
+            complete_pending_response(render)
+        except RerunRequested:
+            pass
+
+    wall_time = time.perf_counter() - started
+    wait_for_pending_calls()
+    apply_background_results(wait=True)
+    handle_due_summary_request()
+    # Applying results can start more calls, e.g. prefetching help for the next question
+    wait_for_pending_calls()
+
+    result = {
+        "stage": stage,
+        "question_index": question_index,
+        "wall_time": round(wall_time, 4),
+        "first_text_time": round(first_text[0], 4) if first_text else None
+    }
+    result.update(usage_delta(before, snapshot_usage()))
+    return result
+
+def run_session(help_every, example_every):
+    """
+    Run one complete questionnaire session.
+
+    Args:
+        help_every (int): Click Help on every nth question, 0 never
+        example_every (int): Type 'example' on every nth question, 0 never
+
+    Returns:
+        dict: Stage results and session totals
+    """
+    import streamlit as st
+    from utils.session import initialize_session_state, process_user_input
+    from ui.components import handle_help_request
+    from services.summary_service import generate_conversation_summary
+    from utils.export import generate_csv, generate_excel, generate_json, generate_pdf
+
+    install_streamlit_shim()
+    stages = [run_stage("start", initialize_session_state)]
+    state = st.session_state
+
+    stages.append(run_stage("introduction", lambda: process_user_input("Jordan Lee from Northwind Power and Light"), 0))
+
+    # Answer each question, allowing a few extra turns for replies that do not advance
+    turns_left = 3 * len(state.questions)
+    while state.current_question_index < len(state.questions) and turns_left:
+        index = state.current_question_index
+        if help_every and index % help_every == 0:
+            stages.append(run_stage("help", handle_help_request, index))
+        if example_every and index % example_every == 0:
+            stages.append(run_stage("example", lambda: process_user_input("example"), index))
+        answer = SAMPLE_ANSWERS[index % len(SAMPLE_ANSWERS)]
+        stages.append(run_stage("answer", lambda: process_user_input(answer), index))
+        turns_left -= 1
+
+    stages.append(run_stage("summary", lambda: process_user_input("summary")))
+    if not state.get("summary_requested"):
+        # Not every section counted as covered; asking again forces the summary
+        stages.append(run_stage("summary", lambda: process_user_input("summary")))
+
+    def finalize():
+        state.explicitly_finished = True
+        state.summary_text = generate_conversation_summary()
+
+    stages.append(run_stage("finalize", finalize))
+    stages.append(run_stage("export_csv", lambda: generate_csv(state.responses)))
+    stages.append(run_stage("export_excel", lambda: generate_excel(state.responses)))
+    stages.append(run_stage("export_json", lambda: generate_json(state.responses, state.user_info)))
+    stages.append(run_stage("export_pdf", lambda: generate_pdf(state.responses, state.user_info)))
+
+    return {
+        "questions_answered": state.current_question_index,
+        "stages": stages,
+        "totals": {
+            "wall_time": round(sum(stage["wall_time"] for stage in stages), 4),
+            "llm_calls": sum(stage["llm_calls"] for stage in stages),
+            "prompt_tokens": sum(stage["prompt_tokens"] for stage in stages),
+            "cached_tokens": sum(stage["cached_tokens"] for stage in stages),
+            "completion_tokens": sum(stage["completion_tokens"] for stage in stages)
+        }
+    }
+
+def percentile(values, share):
+    """
+    Get a percentile of a list of numbers.
+
+    Args:
+        values (list): The numbers
+        share (float): Percentile between 0 and 1
+
+    Returns:
+        float: The value at the percentile, None for an empty list
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def summarize_stages(sessions):
+    """
+    Aggregate stage results across sessions by stage name.
+
+    Args:
+        sessions (list): Results from run_session
+
+    Returns:
+        dict: Per stage name, the count, wall time mean/p50/p95, mean calls and tokens per stage,
+            and the prompt cache hit rate overall and per call type
+    """
+    by_stage = {}
+    for session in sessions:
+        for stage in session["stages"]:
+            by_stage.setdefault(stage["stage"], []).append(stage)
+
+    summary = {}
+    for name, stages in by_stage.items():
+        wall_times = [stage["wall_time"] for stage in stages]
+        summary[name] = {
+            "count": len(stages),
+            "wall_time_mean": round(sum(wall_times) / len(stages), 4),
+            "wall_time_p50": percentile(wall_times, 0.5),
+            "wall_time_p95": percentile(wall_times, 0.95),
+            "llm_calls_mean": round(sum(stage["llm_calls"] for stage in stages) / len(stages), 3),
+            "prompt_tokens_mean": round(sum(stage["prompt_tokens"] for stage in stages) / len(stages), 1),
+            "cached_tokens_mean": round(sum(stage["cached_tokens"] for stage in stages) / len(stages), 1),
+            "cache_hit_rate": get_hit_rate(
+                sum(stage["cached_tokens"] for stage in stages), sum(stage["prompt_tokens"] for stage in stages)
+            ),
+            "cache_by_purpose": summarize_cache_by_purpose(stages)
+        }
+    return summary
+
+def compare_results(before_path, after_path):
+    """
+    Print the per-stage changes between two result files.
+
+    Args:
+        before_path (str): Earlier results JSON
+        after_path (str): Later results JSON
+    """
+    with open(before_path, "r") as file:
+        before = json.load(file)
+    with open(after_path, "r") as file:
+        after = json.load(file)
+
+    print(f"{'stage':<14}{'wall p50':>20}{'llm calls':>18}{'prompt tokens':>22}{'cache hit':>18}")
+    for name, stats in after["stages"].items():
+        old = before["stages"].get(name)
+        if old is None:
+            print(f"{name:<14} (new stage)")
+            continue
+        print(
+            f"{name:<14}"
+            f"{old['wall_time_p50']:>9.3f} -> {stats['wall_time_p50']:<7.3f}"
+            f"{old['llm_calls_mean']:>7.2f} -> {stats['llm_calls_mean']:<7.2f}"
+            f"{old['prompt_tokens_mean']:>10.0f} -> {stats['prompt_tokens_mean']:<8.0f}"
+            # Results written before the cache counters were recorded have no hit rate
+            f"{old.get('cache_hit_rate', 0.0):>7.0%} -> {stats.get('cache_hit_rate', 0.0):<7.0%}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark complete questionnaire sessions against the fake backend")
+    parser.add_argument("--sessions", type=int, default=3, help="Number of sessions to run one after another")
+    parser.add_argument("--mode", default="synthesize", choices=["synthesize", "replay"], help="Fake backend mode")
+    parser.add_argument("--cassette", help="Cassette file for replay mode")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before each fake response starts")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Standard deviation of the latency")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake requests that fail")
+    parser.add_argument("--help-every", type=int, default=5, help="Click Help on every nth question, 0 never")
+    parser.add_argument("--example-every", type=int, default=7, help="Ask for an example on every nth question, 0 never")
+    parser.add_argument("--keep-caches", action="store_true", help="Use the on-disk response and assist caches")
+    parser.add_argument("--output", help="Write the results JSON here instead of printing it")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    # The fake backend is configured from the environment when config is first imported
+    os.environ["ACME_FAKE_BACKEND"] = args.mode
+    os.environ["ACME_FAKE_LATENCY"] = str(args.latency)
+    os.environ["ACME_FAKE_LATENCY_JITTER"] = str(args.jitter)
+    os.environ["ACME_FAKE_CHUNK_DELAY"] = str(args.chunk_delay)
+    os.environ["ACME_FAKE_ERROR_RATE"] = str(args.error_rate)
+    if args.cassette:
+        os.environ["ACME_FAKE_CASSETTE"] = args.cassette
+
+    import config
+    if not args.keep_caches:
+        # Start from cold caches so results do not depend on earlier runs
+        import services.response_cache as response_cache
+        import services.assist_service as assist_service
+        response_cache.RESPONSE_CACHE_PATH = None
+        assist_service.ASSIST_CACHE_PATH = None
+
+    sessions = [run_session(args.help_every, args.example_every) for _ in range(args.sessions)]
+
+    results = {
+        "commit": get_commit(),
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "settings": {
+            "sessions": args.sessions,
+            "mode": args.mode,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "chunk_delay": args.chunk_delay,
+            "error_rate": args.error_rate,
+            "help_every": args.help_every,
+            "example_every": args.example_every,
+            "keep_caches": args.keep_caches,
+            "streaming": config.OPENAI_STREAM_RESPONSES,
+            "unified_turn": config.UNIFIED_TURN_MODE,
+            "hedging": config.HEDGE_CONVERSATION
+        },
+        "stages": summarize_stages(sessions),
+        "session_totals": {
+            key: round(sum(session["totals"][key] for session in sessions) / len(sessions), 4)
+            for key in ("wall_time", "llm_calls", "prompt_tokens", "cached_tokens", "completion_tokens")
+        },
+        "cache_by_purpose": summarize_cache_by_purpose([stage for session in sessions for stage in session["stages"]]),
+        "sessions": sessions
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+        print(f"Wrote {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
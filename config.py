@@ -18,14 +18,153 @@ TOPIC_AREAS = {
     'current_practices': "Section 4: Current Practices and Needs"
 }
 
+# Index of the first question of each section in a plain questions file
+# (QUESTIONS_FILE) and in the built-in questions
+SECTION_START_INDEX = {
+    'crew_manager_usage': 1,
+    'emergency_contract_ops': 8,
+    'resources_reporting': 14,
+    'current_practices': 19
+}
+
 # File paths
-QUESTIONS_FILE = "data/questions.txt"
+QUESTIONNAIRE_FILE = "data/questionnaire.json"  # The questionnaire: questions with ids, sections and follow-up hints
+QUESTIONS_FILE = "data/questions.txt"  # Plain questions, one per line; read only when QUESTIONNAIRE_FILE does not exist
+FILE_RELOAD_CHECK_INTERVAL = 2.0  # seconds between checks of the questionnaire and prompt files for changes
 PROMPT_FILE = "data/prompt.txt"
 
 # OpenAI settings
 OPENAI_MODEL = "gpt-4o-2024-08-06"
 OPENAI_TEMPERATURE = 0.7
 OPENAI_MAX_TOKENS = 150
+OPENAI_BASE_URL = None  # None uses the default OpenAI endpoint
+OPENAI_STREAM_RESPONSES = True  # Render conversation replies token-by-token
+OPENAI_TIMEOUT = 30.0  # seconds per attempt, routes may override with 'timeout'
+USAGE_LOG_EVERY = 100  # log token usage and prompt cache hit rates per call type every this many calls, 0 disables
+
+# Unified turn mode: one structured call returns the reply, topic coverage and answer check
+UNIFIED_TURN_MODE = False
+UNIFIED_TURN_MAX_TOKENS = 400
+
+# Model routing per call type. Missing keys fall back to the OpenAI settings above;
+# 'stop' is a list of stop sequences or None; 'timeout' is seconds per attempt.
+OPENAI_CLASSIFIER_MODEL = "gpt-4o-mini"
+MODEL_ROUTES = {
+    'conversation': {"model": OPENAI_MODEL, "temperature": OPENAI_TEMPERATURE, "max_tokens": OPENAI_MAX_TOKENS, "stop": None},
+    'unified_turn': {"model": OPENAI_MODEL, "temperature": OPENAI_TEMPERATURE, "max_tokens": UNIFIED_TURN_MAX_TOKENS, "stop": None},
+    'help': {"model": OPENAI_MODEL, "temperature": OPENAI_TEMPERATURE, "max_tokens": 250, "stop": None},
+    'example': {"model": OPENAI_MODEL, "temperature": OPENAI_TEMPERATURE, "max_tokens": 250, "stop": None},
+    'advancement': {"model": OPENAI_CLASSIFIER_MODEL, "temperature": 0, "max_tokens": 3, "stop": ["\n"], "timeout": 10.0},
+    'topic_check': {"model": OPENAI_CLASSIFIER_MODEL, "temperature": 0, "max_tokens": 80, "stop": None, "timeout": 10.0},
+    'topic_reconcile': {"model": OPENAI_CLASSIFIER_MODEL, "temperature": 0, "max_tokens": 80, "stop": None, "timeout": 15.0},
+    'user_info': {"model": OPENAI_CLASSIFIER_MODEL, "temperature": 0, "max_tokens": 40, "stop": ["\n"], "timeout": 10.0},
+    'multi_answer': {"model": OPENAI_CLASSIFIER_MODEL, "temperature": 0, "max_tokens": 60, "stop": None, "timeout": 10.0}
+}
+
+# OpenAI connection pool settings (shared by every session in the process)
+OPENAI_POOL_MAX_CONNECTIONS = 20
+OPENAI_POOL_MAX_KEEPALIVE = 10
+OPENAI_POOL_KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept warm
+OPENAI_CLIENT_HEALTH_CHECK_INTERVAL = 300  # seconds between client health checks, 0 disables
+
+# Retries and circuit breaker for OpenAI calls (the client's own retries are disabled)
+OPENAI_MAX_RETRIES = 3  # retries after the first attempt for rate limits, timeouts and server errors
+OPENAI_BACKOFF_BASE = 0.5  # seconds, doubled on each retry and jittered
+OPENAI_BACKOFF_MAX = 8.0  # longest backoff between attempts
+OPENAI_RETRY_AFTER_MAX = 20.0  # fail instead of retrying when the API asks to wait longer than this
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5  # consecutive transient failures that pause calls to a model
+CIRCUIT_BREAKER_RESET_SECONDS = 30.0  # pause before a trial call is let through
+
+# Hedged conversation requests: if no token has arrived after the HEDGE_PERCENTILE of recent
+# first-token times, send a duplicate and use whichever request answers first
+HEDGE_CONVERSATION = False
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # first-token times needed before the percentile is used
+HEDGE_DEFAULT_DELAY = 2.0  # seconds, used until there are enough samples
+HEDGE_MIN_DELAY = 0.5  # never hedge sooner than this
+HEDGE_BUDGET = 0.1  # at most this share of conversation calls may be hedged
+HEDGE_MAX_WORKERS = 8  # threads for hedged reads, kept apart from TURN_PIPELINE_MAX_WORKERS; a hedged call uses one or two
+
+# Shared rate limit for all OpenAI calls in the process; keep below the account limits
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_RPM = 500  # requests per minute
+RATE_LIMIT_TPM = 300000  # tokens per minute, charged as prompt estimate plus max_tokens
+# Admission priority per call type, lower goes first; unlisted call types get the lowest
+RATE_LIMIT_PRIORITIES = {
+    'conversation': 0,
+    'unified_turn': 0,
+    'help': 1,
+    'example': 1,
+    'user_info': 2,
+    'advancement': 2,
+    'topic_check': 3,
+    'topic_reconcile': 3,
+    'multi_answer': 3
+}
+RATE_LIMIT_MAX_WAIT = 30.0  # seconds a call may queue before it fails as rate limited
+RATE_LIMIT_BUSY_WAIT = 2.0  # queueing longer than this shows the app as busy
+RATE_LIMIT_BUSY_WINDOW = 30.0  # seconds the app shows as busy after such a wait
+
+# Fake OpenAI backend for offline runs and benchmarks, see services/fake_backend.py.
+# None uses the real API; 'synthesize' makes up responses, 'replay' answers from the
+# cassette and synthesizes misses, 'record' calls the real API and saves its responses.
+FAKE_BACKEND_MODE = os.environ.get("ACME_FAKE_BACKEND") or None
+FAKE_BACKEND_CASSETTE = os.environ.get("ACME_FAKE_CASSETTE", "data/cassettes/default.json")
+FAKE_BACKEND_LATENCY = float(os.environ.get("ACME_FAKE_LATENCY", "0.3"))  # seconds before the response starts
+FAKE_BACKEND_LATENCY_JITTER = float(os.environ.get("ACME_FAKE_LATENCY_JITTER", "0.1"))  # standard deviation
+FAKE_BACKEND_CHUNK_DELAY = float(os.environ.get("ACME_FAKE_CHUNK_DELAY", "0.02"))  # seconds between streamed chunks
+FAKE_BACKEND_ERROR_RATE = float(os.environ.get("ACME_FAKE_ERROR_RATE", "0.0"))  # share of requests that fail
+FAKE_BACKEND_RATE_LIMIT_SHARE = 0.5  # share of injected failures that are 429s rather than 500s
+FAKE_BACKEND_RETRY_AFTER = 1  # seconds, sent with injected 429s
+
+# Response cache for small, fully determined calls (classifier, extraction)
+RESPONSE_CACHE_PATH = "data/response_cache.sqlite3"  # None keeps the cache in memory only
+RESPONSE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+RESPONSE_CACHE_MEMORY_ENTRIES = 1024
+RESPONSE_CACHE_DISK_ENTRIES = 50000
+
+# Local intent classifier for the ANSWER/QUESTION check
+INTENT_MODEL_FILE = "data/intent_model.json"
+INTENT_EXAMPLES_FILE = "data/intent_examples.txt"
+INTENT_CONFIDENCE_THRESHOLD = 0.85  # Below this the LLM decides
+INTENT_MODEL_MIN_ANSWER_WORDS = 6  # Shorter messages the model calls answers go to the LLM...
+INTENT_SHORT_ANSWER_THRESHOLD = 0.97  # ...unless it is at least this confident
+
+# Local name/organization extraction for the first question
+USER_INFO_CONFIDENCE_THRESHOLD = 0.75  # Below this the LLM extracts the details
+
+# Context window sent with conversation calls
+CONTEXT_TOKEN_BUDGET = 8000  # Includes the system prompt (data/prompt.txt is ~5000 tokens)
+CONTEXT_RECENT_EXCHANGES = 6  # Most recent exchanges always sent verbatim
+CONTEXT_FOLD_BLOCK = 4  # Older exchanges are folded this many at a time to keep the prefix stable
+CONTEXT_SUMMARY_ANSWER_CHARS = 300  # Longest answer quoted in the rolling summary
+
+# Topic coverage: each check looks at the newest exchange only, with a full check every few turns
+COVERAGE_RECONCILE_EVERY = 8  # every nth check goes over the whole conversation, 0 never
+COVERAGE_EVIDENCE_PER_TOPIC = 2  # exchanges kept as evidence for each covered section
+COVERAGE_EXCHANGE_CHARS = 1200  # longest message text sent with an incremental check
+COVERAGE_MAX_EXCHANGES = 6  # more unchecked exchanges than this are checked with a full check instead
+
+# When to run a coverage check after a reply; with scheduling off it runs after every reply
+COVERAGE_SCHEDULING = True
+COVERAGE_ON_SECTION_CHANGE = True  # the answered question is in a different section than at the last check
+COVERAGE_LONG_ANSWER_WORDS = 40  # answers this long may span several sections, 0 disables
+COVERAGE_ON_SUMMARY = True  # the user or the AI asked for the summary
+COVERAGE_CHECK_EVERY = 4  # run at least every nth turn, 0 disables
+
+# Turn pipeline settings
+TURN_PIPELINE_MAX_WORKERS = 16  # Worker threads shared by all sessions for concurrent LLM calls
+
+BACKGROUND_POLL_INTERVAL = 1.0  # seconds between checks for finished background calls in the UI
+
+# Help and example content
+ASSIST_PREFETCH = True  # Generate help and example text in the background when a new question is asked
+# 'minimal' sends only a compact instruction, the question, its section and optionally the
+# organization, and shares the result across sessions; 'full' sends the whole conversation
+ASSIST_CONTEXT_MODE = "minimal"
+ASSIST_INCLUDE_ORGANIZATION = False  # Tailor minimal-context content to the user's organization
+ASSIST_CACHE_PATH = "data/assist_cache.json"  # None keeps the shared cache in memory only
+ASSIST_ARTIFACT_FILE = "data/assists.json"  # Prebuilt content, see 'python init_project.py build-assists'
 
 # Cookie settings
 COOKIE_PREFIX = "acme_"
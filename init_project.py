@@ -2,10 +2,19 @@
 ACME Questionnaire Bot - Project Initialization Script
 
 This script initializes the directory structure and creates needed files.
+It also builds the help/example artifact for the questionnaire:
+
+    python init_project.py                          # initialize the project
+    python init_project.py build-assists            # generate help/examples via the OpenAI API
+    python init_project.py build-assists --offline  # generate generic help/examples locally
+    python init_project.py migrate-questions        # convert data/questions.txt to data/questionnaire.json
 """
 import os
+import sys
 import json
 import shutil
+import argparse
+from datetime import datetime
 
 def init_project():
     """Initialize the project structure and files."""
@@ -30,8 +39,8 @@ def init_project():
             f.write("# Module initialization file\n")
         print(f"Created __init__.py in {directory}")
     
-    # Create sample data files if they don't exist
-    if not os.path.exists("data/questions.txt"):
+    # Create sample data files if they don't exist; a plain questions.txt also counts as a questionnaire
+    if not os.path.exists("data/questionnaire.json") and not os.path.exists("data/questions.txt"):
         questions = """Could you please provide your name and your organization name?
 In what situations will crew management be used by your organization?
 How frequently will you use crew management?
@@ -56,9 +65,9 @@ What reports are currently printed and distributed?
 How would you like data to be organized or filtered?
 What is the significance of data organization in your operations?"""
         
-        with open("data/questions.txt", "w") as f:
-            f.write(questions)
-        print("Created sample questions.txt file")
+        from utils.file_loader import build_plain_questionnaire, write_questionnaire
+        write_questionnaire("data/questionnaire.json", *build_plain_questionnaire(questions.split("\n")))
+        print("Created sample questionnaire.json file")
     
     # Create sample prompt.txt file if it doesn't exist
     if not os.path.exists("data/prompt.txt"):
@@ -128,5 +137,79 @@ python-dotenv>=1.0.0
     print("2. Run 'pip install -r requirements.txt' to install dependencies")
     print("3. Start the application with 'streamlit run main.py'")
 
+def build_assists(offline=False):
+    """
+    Generate help and example text for every question and write the assist artifact.
+    
+    Args:
+        offline (bool): Use the local stand-in instead of the OpenAI API
+    """
+    from config import ASSIST_ARTIFACT_FILE
+    from utils.file_loader import get_questionnaire
+    from utils.file_loader import get_section_for_question
+    from services.assist_service import (
+        ASSIST_KINDS, get_questionnaire_version, build_shared_assist_messages, build_offline_assist
+    )
+    
+    questionnaire = get_questionnaire()
+    questions = list(questionnaire.questions)
+    version = get_questionnaire_version(questionnaire)
+    print(f"Building help and examples for {len(questions)} questions (questionnaire version {version})...")
+    
+    entries = {}
+    for number, question in enumerate(questions, start=1):
+        section = get_section_for_question(number - 1, questionnaire)
+        entries[question] = {}
+        for kind in ASSIST_KINDS:
+            if offline:
+                content = build_offline_assist(kind, question, questionnaire)
+            else:
+                from services.ai_service import get_ai_response
+                from services.resilience import AIServiceError
+                try:
+                    content = get_ai_response(build_shared_assist_messages(kind, question, section), purpose=kind)
+                except AIServiceError as e:
+                    print(f"Could not generate {kind} for question {number}: {e}")
+                    sys.exit(1)
+            entries[question][kind] = content
+        print(f"Generated help and example for question {number}")
+    
+    artifact = {
+        "version": version,
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "source": "offline" if offline else "openai",
+        "entries": entries
+    }
+    
+    with open(ASSIST_ARTIFACT_FILE, "w") as f:
+        json.dump(artifact, f, indent=2)
+    print(f"Wrote {ASSIST_ARTIFACT_FILE}")
+
+def migrate_questions():
+    """Convert the plain questions file into a structured questionnaire file."""
+    from config import QUESTIONS_FILE, QUESTIONNAIRE_FILE
+    from utils.file_loader import read_plain_questionnaire, write_questionnaire
+    
+    if os.path.exists(QUESTIONNAIRE_FILE):
+        print(f"{QUESTIONNAIRE_FILE} already exists; remove it first to convert {QUESTIONS_FILE} again")
+        sys.exit(1)
+    
+    entries, section_titles = read_plain_questionnaire(QUESTIONS_FILE)
+    write_questionnaire(QUESTIONNAIRE_FILE, entries, section_titles)
+    print(f"Wrote {len(entries)} questions from {QUESTIONS_FILE} to {QUESTIONNAIRE_FILE}")
+    print(f"Add follow-up hints there if you like, then delete {QUESTIONS_FILE}")
+
 if __name__ == "__main__":
-    init_project()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ACME Questionnaire Bot project tools")
+    subparsers = parser.add_subparsers(dest="command")
+    build_parser = subparsers.add_parser("build-assists", help="Precompute help and example text for every question")
+    build_parser.add_argument("--offline", action="store_true", help="Use generic local text instead of the OpenAI API")
+    subparsers.add_parser("migrate-questions", help="Convert data/questions.txt into data/questionnaire.json")
+    args = parser.parse_args()
+    
+    if args.command == "build-assists":
+        build_assists(offline=args.offline)
+    elif args.command == "migrate-questions":
+        migrate_questions()
+    else:
+        init_project()
\ No newline at end of file
@@ -5,9 +5,9 @@ Entry point for the ACME Questionnaire Bot application.
 """
 import streamlit as st
 from ui.layout import apply_css, setup_tabs
-from ui.components import display_chat_history, create_input_form
+from ui.components import display_chat_history, create_input_form, poll_background_work
 from utils.cookie_manager import init_cookie_manager, add_save_load_ui
-from utils.session import initialize_session_state, process_user_input
+from utils.session import initialize_session_state, process_user_input, apply_background_results, handle_due_summary_request
 from config import APP_TITLE, APP_DESCRIPTION
 
 def main():
@@ -31,6 +31,10 @@ def main():
     # Initialize session state if not already done
     initialize_session_state()
     
+    # Apply whatever background calls finished since the last run
+    apply_background_results()
+    handle_due_summary_request()
+    
     # Set up the tabs for the UI
     tab1, tab2, tab3 = setup_tabs()
     
@@ -64,6 +68,9 @@ def main():
         # Display chat history
         display_chat_history()
         
+        # Keep applying background results while the user reads
+        poll_background_work()
+        
         # Display the input form for user responses
         user_input, submit_button = create_input_form()
         
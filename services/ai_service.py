@@ -2,54 +2,416 @@
 ACME Questionnaire Bot - AI Service
 
 Functions for interacting with OpenAI API.
+
+Failed calls raise AIServiceError (see services/resilience.py) instead of
+returning an error text, so callers must handle them explicitly.
 """
+import json
+import time
+import threading
+import httpx
 import openai
 import streamlit as st
-from config import OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS
+from services.response_cache import make_cache_key, get_cached_response, set_cached_response
+from services.usage_stats import record_usage
+from services.resilience import API_ERRORS, call_with_retries, record_failure, to_service_error
+from services.rate_limiter import acquire_capacity
+from services.token_estimates import estimate_message_tokens
+from config import (
+    OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS, OPENAI_BASE_URL, OPENAI_TIMEOUT,
+    OPENAI_POOL_MAX_CONNECTIONS, OPENAI_POOL_MAX_KEEPALIVE, OPENAI_POOL_KEEPALIVE_EXPIRY,
+    OPENAI_CLIENT_HEALTH_CHECK_INTERVAL, MODEL_ROUTES, FAKE_BACKEND_MODE
+)
+
+# Process-wide registry of pooled clients, shared by all Streamlit sessions.
+# Keyed by (api_key, base_url); each entry holds the client and the time of its last health check.
+_client_registry = {}
+_client_registry_lock = threading.Lock()
+
+# Calls in flight per client, and clients taken out of the registry that are
+# closed once their last call has finished
+_client_users = {}
+_retired_clients = set()
+
+def create_http_client():
+    """
+    Create an HTTP client with keep-alive connection pooling.
+
+    When FAKE_BACKEND_MODE is set, requests are answered by the local fake backend instead.
+
+    Returns:
+        httpx.Client: HTTP client configured with the pool limits from config
+    """
+    if FAKE_BACKEND_MODE:
+        from services.fake_backend import FakeOpenAITransport
+        return httpx.Client(transport=FakeOpenAITransport())
+
+    limits = httpx.Limits(
+        max_connections=OPENAI_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_POOL_KEEPALIVE_EXPIRY
+    )
+    return httpx.Client(limits=limits)
+
+def check_client_health(client):
+    """
+    Check that a pooled client is still usable.
+
+    Args:
+        client (OpenAI): The client to check
+
+    Returns:
+        bool: True if the client is open and the API is reachable, False otherwise
+    """
+    if client.is_closed():
+        return False
+    try:
+        client.with_options(timeout=5.0).models.retrieve(OPENAI_MODEL)
+        return True
+    except openai.APIStatusError:
+        # The API answered, so the connection itself is healthy
+        return True
+    except Exception as e:
+        print(f"OpenAI client health check failed: {e}")
+        return False
+
+def get_openai_client(api_key=None, base_url=None):
+    """
+    Get the shared OpenAI client for an API key and base URL, creating it on first use.
+
+    The client is reused by every session in the process so that calls share warm
+    keep-alive connections instead of paying for a new connection pool each time.
+
+    Args:
+        api_key (str): API key, defaults to OPENAI_API_KEY from Streamlit secrets
+            (not needed with the fake backend)
+        base_url (str): API base URL, defaults to OPENAI_BASE_URL from config
+
+    Returns:
+        OpenAI: Pooled OpenAI client
+    """
+    if api_key is None:
+        api_key = "fake-backend" if FAKE_BACKEND_MODE in ("synthesize", "replay") else st.secrets["OPENAI_API_KEY"]
+    if base_url is None:
+        base_url = OPENAI_BASE_URL
+    key = (api_key, base_url)
+
+    with _client_registry_lock:
+        entry = _client_registry.get(key)
+        now = time.monotonic()
+
+        if entry is not None and entry["client"].is_closed():
+            entry = None
+
+        if entry is None:
+            # Retries are handled by call_with_retries, which also honours Retry-After
+            client = openai.OpenAI(
+                api_key=api_key, base_url=base_url, http_client=create_http_client(), max_retries=0
+            )
+            _client_registry[key] = {"client": client, "checked_at": now}
+            return client
+
+        client = entry["client"]
+        health_check_due = bool(OPENAI_CLIENT_HEALTH_CHECK_INTERVAL) and now - entry["checked_at"] > OPENAI_CLIENT_HEALTH_CHECK_INTERVAL
+        if health_check_due:
+            entry["checked_at"] = now
+
+    # Run the health check outside the lock so other sessions are not held up by it
+    if health_check_due and not check_client_health(client):
+        invalidate_openai_client(client)
+        return get_openai_client(api_key, base_url)
+
+    return client
+
+def invalidate_openai_client(client):
+    """
+    Remove a client from the registry so the next call builds a fresh one.
+
+    Other sessions may still have requests or streams open on the client, so
+    it is only closed once the last of them has released it.
+
+    Args:
+        client (OpenAI): The client to discard
+    """
+    with _client_registry_lock:
+        removed = False
+        for key, entry in list(_client_registry.items()):
+            if entry["client"] is client:
+                del _client_registry[key]
+                removed = True
+        if not removed or client in _retired_clients:
+            return
+        _retired_clients.add(client)
+        if _client_users.get(client):
+            return
+
+    close_retired_client(client)
+
+def acquire_openai_client():
+    """
+    Get the shared client and count this call as one of its users.
+
+    Returns:
+        OpenAI: Pooled OpenAI client, to be handed back with release_openai_client
+    """
+    while True:
+        client = initialize_openai_client()
+        with _client_registry_lock:
+            # A client retired since it was looked up is skipped
+            if client not in _retired_clients and not client.is_closed():
+                _client_users[client] = _client_users.get(client, 0) + 1
+                return client
+
+def release_openai_client(client):
+    """
+    Hand back a client from acquire_openai_client, closing it if it was retired and this was its last user.
+
+    Args:
+        client (OpenAI): The client
+    """
+    with _client_registry_lock:
+        users = _client_users.get(client, 0) - 1
+        if users > 0:
+            _client_users[client] = users
+            return
+        _client_users.pop(client, None)
+        if client not in _retired_clients:
+            return
+
+    close_retired_client(client)
+
+def close_retired_client(client):
+    """
+    Close a retired client that nobody is using any more.
+
+    Args:
+        client (OpenAI): The client
+    """
+    client.close()
+    with _client_registry_lock:
+        _retired_clients.discard(client)
+
+def hold_stream(stream, client):
+    """
+    Relay a streamed response and release its client when the stream ends or is closed.
+
+    Args:
+        stream: The stream from client.chat.completions.create
+        client (OpenAI): The client the stream uses, from acquire_openai_client
+
+    Yields:
+        The stream's chunks
+    """
+    try:
+        yield from stream
+    finally:
+        stream.close()
+        release_openai_client(client)
+
+def get_route(purpose):
+    """
+    Get the model settings for a call type.
+
+    Args:
+        purpose (str): Call type, a key of MODEL_ROUTES
+
+    Returns:
+        dict: Settings with model, temperature, max_tokens, stop and timeout
+    """
+    route = {
+        "model": OPENAI_MODEL, "temperature": OPENAI_TEMPERATURE, "max_tokens": OPENAI_MAX_TOKENS,
+        "stop": None, "timeout": OPENAI_TIMEOUT
+    }
+    route.update(MODEL_ROUTES.get(purpose, {}))
+    return route
+
+def build_completion_args(messages, purpose):
+    """
+    Build the chat completion arguments for a call type.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        purpose (str): Call type, a key of MODEL_ROUTES
+
+    Returns:
+        dict: Keyword arguments for client.chat.completions.create
+    """
+    route = get_route(purpose)
+    args = {
+        "model": route["model"],
+        "messages": messages,
+        "max_tokens": route["max_tokens"],
+        "temperature": route["temperature"],
+        "timeout": route["timeout"]
+    }
+    if route["stop"]:
+        args["stop"] = route["stop"]
+    return args
 
 def initialize_openai_client():
     """
     Initialize the OpenAI client with API key from Streamlit secrets.
-    
+
     Returns:
-        OpenAI: Initialized OpenAI client
+        OpenAI: Shared, pooled OpenAI client
     """
     try:
-        client = openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-        return client
+        return get_openai_client()
     except Exception as e:
         st.error(f"Error initializing OpenAI client: {e}")
         st.error("Please check that OPENAI_API_KEY is set in your Streamlit secrets.")
         st.stop()
 
-def get_ai_response(messages):
+def create_completion(completion_args, purpose, on_stream_open=None, **options):
+    """
+    Create a chat completion with retries, backoff and the circuit breaker.
+
+    Every attempt waits for capacity in the shared rate limiter first.
+
+    Args:
+        completion_args (dict): Arguments from build_completion_args
+        purpose (str): Call type, reported in errors
+        on_stream_open (callable): With stream=True, called with a function that closes the
+            response; it may be called from another thread to cancel the stream
+        **options: Extra arguments for client.chat.completions.create
+
+    Returns:
+        The API response, or with stream=True a generator of chunks that releases the client when closed
+
+    Raises:
+        AIServiceError: If the call failed
+    """
+    tokens = estimate_message_tokens(completion_args["messages"]) + completion_args["max_tokens"]
+
+    def attempt():
+        acquire_capacity(purpose, tokens)
+
+        # Reuse the pooled client for this process
+        client = acquire_openai_client()
+        try:
+            response = client.chat.completions.create(**completion_args, **options)
+        except openai.APIConnectionError:
+            # Drop the client so a broken pool is not reused; it is closed once other calls are done with it
+            invalidate_openai_client(client)
+            release_openai_client(client)
+            raise
+        except BaseException:
+            release_openai_client(client)
+            raise
+
+        if options.get("stream"):
+            if on_stream_open:
+                on_stream_open(response.close)
+            # A stream keeps using the client until it is closed
+            return hold_stream(response, client)
+        release_openai_client(client)
+        return response
+
+    return call_with_retries(attempt, completion_args["model"], purpose)
+
+def get_ai_response(messages, cache=False, purpose="conversation"):
     """
     Get a response from the OpenAI API.
-    
+
     Args:
         messages (list): List of message dictionaries with role and content
-        
+        cache (bool): Whether to reuse a cached response for an identical request.
+            Only suitable for small, fully determined prompts such as classifiers.
+        purpose (str): Call type, selects the model settings from MODEL_ROUTES
+
     Returns:
         str: The AI's response text
+
+    Raises:
+        AIServiceError: If the call failed
+    """
+    completion_args = build_completion_args(messages, purpose)
+
+    cache_key = None
+    if cache:
+        cache_key = make_cache_key(completion_args)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+    response = create_completion(completion_args, purpose)
+    record_usage(purpose, response.usage)
+
+    content = (response.choices[0].message.content or "").strip()
+    if cache_key is not None:
+        set_cached_response(cache_key, content)
+    return content
+
+def stream_ai_response(messages, purpose="conversation", on_open=None, cancelled=None):
+    """
+    Stream a response from the OpenAI API as it is generated.
+
+    Opening the stream is retried like any other call; a failure after text
+    has arrived is raised as is, since the text cannot be taken back.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        purpose (str): Call type, selects the model settings from MODEL_ROUTES
+        on_open (callable): Called with a function that closes the response, which
+            another thread may call to cancel the stream
+        cancelled (threading.Event): Set before the stream is closed on purpose; the
+            error that closing causes is then not counted against the circuit breaker
+
+    Yields:
+        str: Pieces of the AI's response text in the order they arrive
+
+    Raises:
+        AIServiceError: If the call failed
     """
+    completion_args = build_completion_args(messages, purpose)
+    stream = create_completion(
+        completion_args, purpose, on_stream_open=on_open, stream=True, stream_options={"include_usage": True}
+    )
+
     try:
-        # Initialize the OpenAI client
-        client = initialize_openai_client()
-        
-        # Call the API
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            max_tokens=OPENAI_MAX_TOKENS,
-            temperature=OPENAI_TEMPERATURE
-        )
-        
-        return response.choices[0].message.content.strip()
-    except openai.APIError as e:
-        error_msg = f"Error: {e}"
-        print(error_msg)
-        return error_msg
-    except Exception as e:
-        error_msg = f"Unexpected error: {e}"
-        print(error_msg)
-        return error_msg
\ No newline at end of file
+        for chunk in stream:
+            # The final chunk carries the usage and no choices
+            if chunk.usage is not None:
+                record_usage(purpose, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except API_ERRORS as e:
+        if cancelled is None or not cancelled.is_set():
+            record_failure(completion_args["model"])
+            print(f"OpenAI {purpose} stream failed: {e}")
+        raise to_service_error(e, purpose) from e
+    finally:
+        # Release the connection even when the caller stops reading early
+        stream.close()
+
+def get_structured_response(messages, schema_name, schema, purpose="unified_turn"):
+    """
+    Get a JSON response from the OpenAI API that follows a JSON schema.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        schema_name (str): Name of the schema, reported to the API
+        schema (dict): JSON schema the response must follow
+        purpose (str): Call type, selects the model settings from MODEL_ROUTES
+
+    Returns:
+        dict: The decoded response, or None if it is not valid JSON
+
+    Raises:
+        AIServiceError: If the call failed
+    """
+    response = create_completion(
+        build_completion_args(messages, purpose),
+        purpose,
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "strict": True, "schema": schema}
+        }
+    )
+    record_usage(purpose, response.usage)
+
+    try:
+        return json.loads(response.choices[0].message.content)
+    except (TypeError, json.JSONDecodeError) as e:
+        print(f"Could not decode structured response: {e}")
+        return None
@@ -0,0 +1,480 @@
+"""
+ACME Questionnaire Bot - Assist Service
+
+Functions for generating the help and example content for the current question,
+including speculative prefetching so the Help and Example buttons answer instantly
+and a cache of content per scripted question shared by all sessions.
+
+In the default minimal-context mode a request carries only a compact instruction,
+the question, its section and optionally the organization, instead of the whole
+conversation.
+"""
+import os
+import json
+import hashlib
+import itertools
+import threading
+from concurrent.futures import Future
+import streamlit as st
+from services.ai_service import get_ai_response
+from services.resilience import AIServiceError
+from services.turn_pipeline import submit_call
+from utils.context_window import get_context_messages
+from utils.file_loader import get_questionnaire, get_section_for_question, get_question_hint, get_session_questionnaire
+from config import (
+    TOPIC_AREAS, ASSIST_PREFETCH, ASSIST_CONTEXT_MODE, ASSIST_INCLUDE_ORGANIZATION,
+    ASSIST_CACHE_PATH, ASSIST_ARTIFACT_FILE
+)
+
+# Kinds of assist content
+ASSIST_KINDS = ("help", "example")
+
+# Part of the version of cached and prebuilt content. Bump it when the content
+# should be regenerated for a reason the prompts themselves do not show, such as
+# a change of model.
+ASSIST_TEMPLATE_VERSION = 1
+
+# Instruction for minimal-context help and example requests
+MINIMAL_ASSIST_INSTRUCTIONS = (
+    "You help people answer the ACME Crew Manager questionnaire, which solution consultants use "
+    "to understand how a utility manages its crews, resources, emergency operations and reporting. "
+    "Be friendly, brief and specific to the question. Do not ask about anything else."
+)
+
+# Shared cache of (questionnaire version, kind, question, organization) -> content, plus the calls in flight
+_shared_assists = None
+_inflight_assists = {}
+_shared_lock = threading.Lock()
+
+# Snapshots of the shared cache are numbered and written outside _shared_lock; only
+# the newest snapshot that reached the writer is kept
+_save_numbers = itertools.count(1)
+_saved_number = 0
+_save_lock = threading.Lock()
+
+# The last questionnaire a version was computed for, and that version
+_last_version = (None, None)
+
+def find_last_question():
+    """
+    Find the most recent question asked by the assistant.
+    
+    Returns:
+        str: The last assistant message containing a question, or the last assistant message
+    """
+    last_message = None
+    for msg in reversed(st.session_state.visible_messages):
+        if msg["role"] == "assistant":
+            if "?" in msg["content"]:
+                return msg["content"]
+            if last_message is None:
+                last_message = msg["content"]
+    return last_message
+
+def build_assist_messages(kind, last_question):
+    """
+    Build the request messages for help or example content.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        last_question (str): The question the content is for
+        
+    Returns:
+        list: Messages to send
+    """
+    if kind == "help":
+        return get_context_messages(tail=[
+            {
+                "role": "system", 
+                "content": f"The user is asking for help with the CURRENT question which is: '{last_question}'. Provide a helpful explanation specifically for THIS question, not a previous one."
+            },
+            {"role": "user", "content": "I need help with this question"}
+        ])
+    
+    return get_context_messages(tail=[{
+        "role": "system", 
+        "content": f"""
+        Provide an example answer for the LAST question you asked, which was: 
+        "{last_question}"
+        
+        The example MUST be directly relevant to what you just asked the user.
+        
+        Format your response EXACTLY as follows, including the spacing:
+        
+        *Example: "[your example here]"*
+        
+        [BLANK LINE]
+        
+        To continue with our question, [restate the original question in full]
+        
+        Note: There must be a completely blank line between the example and the question to create visual separation.
+        """
+    }])
+
+def get_questionnaire_version(questionnaire):
+    """
+    Identify the version of the help and example content for a questionnaire.
+    
+    Covers everything the content is generated from: ASSIST_TEMPLATE_VERSION and,
+    for every question, its text, section and hint and the shared and offline
+    prompts built for it. Changing any of them invalidates the persisted cache
+    and the prebuilt artifact.
+    
+    Args:
+        questionnaire (QuestionnaireIndex): The questionnaire
+        
+    Returns:
+        str: Short hash of the questionnaire and the assist templates
+    """
+    global _last_version
+    last_questionnaire, version = _last_version
+    if last_questionnaire is questionnaire:
+        return version
+    
+    digest = hashlib.sha256(f"assist templates v{ASSIST_TEMPLATE_VERSION}".encode("utf-8"))
+    for question, section, hint in zip(questionnaire.questions, questionnaire.sections, questionnaire.hints):
+        parts = [question, section or "", hint]
+        for kind in ASSIST_KINDS:
+            parts.extend(message["content"] for message in build_shared_assist_messages(kind, question, section))
+            parts.append(build_offline_assist(kind, question, questionnaire))
+        digest.update("\0".join(parts).encode("utf-8"))
+        digest.update(b"\1")
+    
+    version = digest.hexdigest()[:12]
+    _last_version = (questionnaire, version)
+    return version
+
+def build_shared_assist_messages(kind, question, section=None, organization=""):
+    """
+    Build minimal-context request messages for help or example content.
+    
+    Only a compact instruction, the scripted question, its section and optionally
+    the organization are sent, so the content can be reused by other sessions.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        question (str): The scripted question from the questionnaire
+        section (str): Topic key of the question's section, if known
+        organization (str): The user's organization, if the content should be tailored to it
+        
+    Returns:
+        list: Messages to send
+    """
+    details = f"Question: {question}"
+    if section:
+        details = f"Section: {TOPIC_AREAS[section]}\n{details}"
+    if organization:
+        details += f"\nOrganization: {organization}"
+    
+    if kind == "help":
+        task = "Explain in two or three sentences what this question is asking and what a useful answer covers."
+    else:
+        task = f"""Provide a realistic example answer to this question.
+        
+        Format your response EXACTLY as follows, including the spacing:
+        
+        *Example: "[your example here]"*
+        
+        [BLANK LINE]
+        
+        To continue with our question, {question}"""
+    
+    return [
+        {"role": "system", "content": MINIMAL_ASSIST_INSTRUCTIONS},
+        {"role": "user", "content": f"{details}\n\n{task}"}
+    ]
+
+def build_offline_assist(kind, question, questionnaire=None):
+    """
+    Write generic help or example content for a question without an AI call.
+    
+    Used as a local stand-in when building the assist artifact offline and when
+    the AI call for the content fails.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        question (str): The scripted question
+        questionnaire (QuestionnaireIndex): Where to look up the question's hint, the current one if not given
+        
+    Returns:
+        str: The content
+    """
+    if kind == "help":
+        hint = get_question_hint(question, questionnaire)
+        if hint:
+            hint = f" It helps to mention: {hint}"
+        return f"This question asks: {question}{hint} Describe how your organization handles this today, who is involved, and any tools, documents or rules you rely on. A short, practical description is enough."
+    
+    return f"*Example: \"We handle this with a shared spreadsheet that our supervisors update every morning, and we follow up by phone when something changes.\"*\n\nTo continue with our question, {question}"
+
+def load_assist_artifact(file_path=ASSIST_ARTIFACT_FILE):
+    """
+    Load the prebuilt help and example content.
+    
+    Args:
+        file_path (str): Path to the artifact written by 'init_project.py build-assists'
+        
+    Returns:
+        dict: Mapping of (version, kind, question, organization) to content, empty if the artifact is missing
+    """
+    if not file_path or not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r') as file:
+            artifact = json.load(file)
+        return {
+            (artifact["version"], kind, question, ""): content
+            for question, contents in artifact["entries"].items()
+            for kind, content in contents.items()
+        }
+    except Exception as e:
+        print(f"Could not load assist artifact: {e}")
+        return {}
+
+def get_current_assist_version():
+    """
+    Get the version of the help and example content for the questionnaire in use.
+    
+    Returns:
+        str: Version from get_questionnaire_version
+    """
+    return get_questionnaire_version(get_questionnaire())
+
+def preload_assists():
+    """Load the prebuilt and persisted assist content, once per process."""
+    version = get_current_assist_version()
+    with _shared_lock:
+        load_shared_assists(version)
+
+def load_shared_assists(version):
+    """
+    Load the prebuilt artifact and the persisted shared cache on first use. Must be called with the lock held.
+    
+    Args:
+        version (str): Current version from get_current_assist_version; content for other versions is dropped
+    """
+    global _shared_assists
+    if _shared_assists is not None:
+        return
+    
+    _shared_assists = {}
+    if ASSIST_CACHE_PATH and os.path.exists(ASSIST_CACHE_PATH):
+        try:
+            with open(ASSIST_CACHE_PATH, 'r') as file:
+                for entry in json.load(file).get("entries", []):
+                    key = (entry["version"], entry["kind"], entry["question"], entry.get("organization", ""))
+                    _shared_assists[key] = entry["text"]
+        except Exception as e:
+            print(f"Could not load assist cache: {e}")
+    
+    # Prebuilt content takes precedence over anything generated at runtime
+    _shared_assists.update(load_assist_artifact())
+    prune_shared_assists({version})
+
+def prune_shared_assists(versions):
+    """
+    Drop shared content for questionnaire versions no longer in use. Must be called with the lock held.
+    
+    Args:
+        versions (set): Versions to keep
+    """
+    stale = [key for key in _shared_assists if key[0] not in versions]
+    for key in stale:
+        del _shared_assists[key]
+    if stale:
+        print(f"Dropped {len(stale)} help and example entries for old questionnaire versions")
+
+def get_shared_assist_snapshot():
+    """
+    Copy the shared cache for saving. Must be called with the lock held.
+    
+    Returns:
+        tuple: (snapshot number, entries) for save_shared_assists
+    """
+    entries = [
+        {"version": version, "kind": kind, "question": question, "organization": organization, "text": text}
+        for (version, kind, question, organization), text in _shared_assists.items()
+    ]
+    return next(_save_numbers), entries
+
+def save_shared_assists(number, entries):
+    """
+    Write a snapshot of the shared cache to disk atomically, unless a newer one was already written.
+    
+    Called without _shared_lock, so lookups in other sessions do not wait for the disk.
+    
+    Args:
+        number (int): Snapshot number from get_shared_assist_snapshot
+        entries (list): Entries from get_shared_assist_snapshot
+    """
+    global _saved_number
+    if not ASSIST_CACHE_PATH:
+        return
+    
+    with _save_lock:
+        if number < _saved_number:
+            return
+        try:
+            temp_path = f"{ASSIST_CACHE_PATH}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"entries": entries}, f, indent=2)
+            os.replace(temp_path, ASSIST_CACHE_PATH)
+            _saved_number = number
+        except Exception as e:
+            print(f"Could not save assist cache: {e}")
+
+def get_shared_assist(kind, question, version, section=None, organization=""):
+    """
+    Get help or example content for a scripted question from the shared cache.
+    
+    The first request generates the content; concurrent requests for the same
+    content wait for that one call instead of making their own. Does not touch
+    the session state, so it can run on a worker thread.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        question (str): The scripted question from the questionnaire
+        version (str): Questionnaire version from get_questionnaire_version
+        section (str): Topic key of the question's section, if known
+        organization (str): The user's organization, if the content should be tailored to it
+        
+    Returns:
+        str: The content to show
+        
+    Raises:
+        AIServiceError: If the content could not be generated; failures are never cached
+    """
+    key = (version, kind, question, organization)
+    
+    with _shared_lock:
+        if _shared_assists is None:
+            load_shared_assists(get_current_assist_version())
+        if key in _shared_assists:
+            return _shared_assists[key]
+        
+        future = _inflight_assists.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_assists[key] = future
+    
+    if not is_owner:
+        return future.result()
+    
+    try:
+        content = get_ai_response(build_shared_assist_messages(kind, question, section, organization), purpose=kind)
+    except Exception as e:
+        with _shared_lock:
+            del _inflight_assists[key]
+        future.set_exception(e)
+        raise
+    
+    # Sessions still on an older questionnaire keep their own version's content
+    current_version = get_current_assist_version()
+    with _shared_lock:
+        del _inflight_assists[key]
+        _shared_assists[key] = content
+        prune_shared_assists({current_version, version})
+        snapshot = get_shared_assist_snapshot()
+    future.set_result(content)
+    save_shared_assists(*snapshot)
+    return content
+
+def get_shared_assist_args():
+    """
+    Collect the session details that identify shared content for the current question.
+    
+    Returns:
+        tuple: (question, version, section, organization) for get_shared_assist
+    """
+    questionnaire = get_session_questionnaire()
+    organization = ""
+    if ASSIST_INCLUDE_ORGANIZATION:
+        organization = st.session_state.get("user_info", {}).get("company", "")
+    return (
+        st.session_state.current_question,
+        get_questionnaire_version(questionnaire),
+        get_section_for_question(st.session_state.current_question_index, questionnaire),
+        organization
+    )
+
+def prefetch_assists():
+    """Start generating help and example content for the current question in the background."""
+    if not ASSIST_PREFETCH:
+        return
+    
+    if ASSIST_CONTEXT_MODE == "minimal":
+        # The shared cache de-duplicates, so later requests pick up these calls
+        for kind in ASSIST_KINDS:
+            submit_call(get_shared_assist, kind, *get_shared_assist_args())
+        return
+    
+    last_question = find_last_question()
+    if not last_question:
+        return
+    
+    # Messages are built here because worker threads cannot read the session state
+    st.session_state.assist_prefetch = {
+        "question_index": st.session_state.current_question_index,
+        "question": last_question,
+        "futures": {
+            kind: submit_call(get_ai_response, build_assist_messages(kind, last_question), purpose=kind)
+            for kind in ASSIST_KINDS
+        }
+    }
+
+def get_prefetched_assist(kind, last_question):
+    """
+    Get prefetched content if it is ready and still for the current question.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        last_question (str): The question the content is needed for
+        
+    Returns:
+        str: The prefetched content, or None if it is not available
+    """
+    prefetch = st.session_state.get("assist_prefetch")
+    if not prefetch:
+        return None
+    if prefetch["question_index"] != st.session_state.current_question_index or prefetch["question"] != last_question:
+        return None
+    
+    future = prefetch["futures"].get(kind)
+    if future is None or not future.done():
+        return None
+    
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Prefetched {kind} failed: {e}")
+        return None
+
+def get_assist(kind):
+    """
+    Get help or example content for the current question.
+    
+    In minimal-context mode uses the shared per-question cache. In full-context
+    mode uses prefetched content when it is ready and falls back to a live call.
+    If the AI call fails, generic content is shown instead.
+    
+    Args:
+        kind (str): 'help' or 'example'
+        
+    Returns:
+        str: The content to show
+    """
+    try:
+        if ASSIST_CONTEXT_MODE == "minimal" and st.session_state.current_question_index < len(st.session_state.questions):
+            return get_shared_assist(kind, *get_shared_assist_args())
+        
+        last_question = find_last_question()
+        
+        prefetched = get_prefetched_assist(kind, last_question)
+        if prefetched:
+            return prefetched
+        
+        return get_ai_response(build_assist_messages(kind, last_question), purpose=kind)
+    except AIServiceError as e:
+        print(f"Could not get {kind} content: {e}")
+        return build_offline_assist(kind, st.session_state.current_question, get_session_questionnaire())
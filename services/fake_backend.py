@@ -0,0 +1,434 @@
+"""
+ACME Questionnaire Bot - Fake Backend
+
+An in-process stand-in for the OpenAI chat completions API, plugged into the
+pooled HTTP client as an httpx transport. It can replay recorded responses
+from a cassette file, record real responses into one, or synthesize plausible
+responses for every call the bot makes, with configurable latency and errors.
+
+Select it with FAKE_BACKEND_MODE in config.py or the ACME_FAKE_BACKEND
+environment variable: 'synthesize', 'replay' or 'record'.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import httpx
+from config import (
+    FAKE_BACKEND_MODE, FAKE_BACKEND_CASSETTE,
+    FAKE_BACKEND_LATENCY, FAKE_BACKEND_LATENCY_JITTER, FAKE_BACKEND_CHUNK_DELAY,
+    FAKE_BACKEND_ERROR_RATE, FAKE_BACKEND_RATE_LIMIT_SHARE, FAKE_BACKEND_RETRY_AFTER
+)
+
+# Loaded cassettes, keyed by file path; each maps a request key to the recorded response
+_cassettes = {}
+_cassette_lock = threading.Lock()
+
+# Simulated prompt cache: like the real one it serves the longest message prefix of an
+# earlier request, once the prefix has at least 1024 tokens, in blocks of 128 tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_BLOCK_TOKENS = 128
+PROMPT_CACHE_MAX_PREFIXES = 10000
+_prompt_prefixes = set()
+_prompt_prefix_lock = threading.Lock()
+
+def make_request_key(body):
+    """
+    Build the cassette key for a chat completion request.
+
+    Args:
+        body (dict): The decoded request body
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = {key: value for key, value in body.items() if key not in ("stream_options", "timeout")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_cassette(file_path):
+    """
+    Load a cassette file once per process.
+
+    Args:
+        file_path (str): Path to the cassette JSON file
+
+    Returns:
+        dict: Mapping of request key to recorded response, empty if the file does not exist
+    """
+    with _cassette_lock:
+        if file_path not in _cassettes:
+            interactions = {}
+            if os.path.exists(file_path):
+                with open(file_path, "r", encoding="utf-8") as file:
+                    for interaction in json.load(file).get("interactions", []):
+                        interactions[interaction["key"]] = interaction["response"]
+            _cassettes[file_path] = interactions
+        return _cassettes[file_path]
+
+def save_interaction(file_path, key, request_body, response):
+    """
+    Add a recorded response to a cassette and write the file.
+
+    Args:
+        file_path (str): Path to the cassette JSON file
+        key (str): Request key from make_request_key
+        request_body (dict): The decoded request body, kept for reference
+        response (dict): Recorded status, content type and body text
+    """
+    interactions = load_cassette(file_path)
+    with _cassette_lock:
+        interactions[key] = dict(response, request=request_body)
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a half-written cassette
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"interactions": [
+                    {"key": item_key, "request": item.get("request"), "response": {k: v for k, v in item.items() if k != "request"}}
+                    for item_key, item in interactions.items()
+                ]},
+                file,
+                indent=2,
+                ensure_ascii=False
+            )
+        os.replace(temp_path, file_path)
+
+def find_question_index(messages):
+    """
+    Find the scripted question the assistant asked last, a stand-in for questionnaire progress.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+
+    Returns:
+        int: Index of the question in the questions file, 0 if none was found
+    """
+    from utils.file_loader import get_questionnaire
+
+    questions = get_questionnaire().questions
+    for message in reversed(messages):
+        if message["role"] != "assistant":
+            continue
+        for index in range(len(questions) - 1, -1, -1):
+            if questions[index] in message["content"]:
+                return index
+    return 0
+
+def get_last_user_message(messages):
+    """
+    Get the text of the latest user message.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+
+    Returns:
+        str: The message text, empty if there is none
+    """
+    for message in reversed(messages):
+        if message["role"] == "user":
+            return message["content"]
+    return ""
+
+def get_line_value(text, label):
+    """
+    Get the rest of the line after a label such as 'User message:'.
+
+    Args:
+        text (str): Text to search
+        label (str): Label that starts the value
+
+    Returns:
+        str: The value, empty if the label is missing
+    """
+    if label not in text:
+        return ""
+    return text.split(label, 1)[1].split("\n", 1)[0].strip()
+
+def get_section_starts():
+    """
+    Get the index of the first question of each section.
+
+    Returns:
+        dict: Mapping of topic key to question index
+    """
+    from utils.file_loader import get_questionnaire
+
+    return {topic: indexes[0] for topic, indexes in get_questionnaire().section_questions.items() if indexes}
+
+def synthesize_topic_coverage(messages):
+    """
+    Mark each section covered once the conversation has moved past its first question.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+
+    Returns:
+        dict: Mapping of topic key to covered status
+    """
+    question_index = find_question_index(messages)
+    return {topic: question_index > start for topic, start in get_section_starts().items()}
+
+def synthesize_reply(messages):
+    """
+    Write a conversation reply that moves on to the next scripted question.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+
+    Returns:
+        str: The reply
+    """
+    from utils.file_loader import get_questionnaire
+
+    questions = get_questionnaire().questions
+    next_index = find_question_index(messages) + 1
+    if next_index >= len(questions):
+        return "Thank you, that covers everything. Type 'summary' to see your answers."
+    return f"Thanks for sharing that. {questions[next_index]}"
+
+def synthesize_content(body):
+    """
+    Write a plausible response for any call the bot makes.
+
+    Args:
+        body (dict): The decoded request body
+
+    Returns:
+        str: The response text
+    """
+    messages = body["messages"]
+    last = messages[-1]["content"] if messages else ""
+    response_format = body.get("response_format") or {}
+
+    if response_format.get("type") == "json_schema":
+        return json.dumps({
+            "assistant_message": synthesize_reply(messages),
+            "topic_coverage": synthesize_topic_coverage(messages),
+            "answered_current_question": not get_last_user_message(messages).strip().endswith("?"),
+            "summary_requested": False
+        })
+
+    if "Reply with exactly 'ANSWER' or 'QUESTION'" in last:
+        user_message = get_line_value(last, "User message:")
+        return "QUESTION" if user_message.endswith("?") or user_message.lower() == "help" else "ANSWER"
+
+    if "Newest exchanges:" in last:
+        # Incremental coverage check: each exchange covers the section of the question it answers
+        asked = [
+            {"role": "assistant", "content": line.split("Assistant asked:", 1)[1]}
+            for line in last.split("\n") if line.startswith("Assistant asked:")
+        ]
+        question_index = max(find_question_index([message]) for message in asked) if asked else 0
+        coverage = json.loads(get_line_value(last, "Current coverage:") or "{}")
+        updates = {topic: bool(coverage.get(topic)) or question_index >= start for topic, start in get_section_starts().items()}
+        return f"TOPIC_UPDATE: {json.dumps(updates)}"
+
+    if "TOPIC_UPDATE message" in last:
+        return f"TOPIC_UPDATE: {json.dumps(synthesize_topic_coverage(messages))}"
+
+    if "Extract only the name and organization" in last:
+        from utils.extract import extract_user_info_locally
+        extracted, _ = extract_user_info_locally(get_line_value(last, "User response:"))
+        return f"NAME: {extracted['name']}, ORGANIZATION: {extracted['company']}"
+
+    if "additional_topics" in last:
+        return '{"additional_topics": []}'
+
+    if "example answer" in last.lower():
+        question = get_line_value(last, "Question:") or "could you tell me how this works for you today?"
+        return f"*Example: \"We keep a shared roster that supervisors update each morning.\"*\n\nTo continue with our question, {question}"
+
+    if last == "I need help with this question" or ("explain" in last.lower() and "question" in last.lower()):
+        return "This question asks how your organization handles this today. A short, practical description is enough."
+
+    return synthesize_reply(messages)
+
+def get_cached_prompt_tokens(body):
+    """
+    Get the prompt tokens the simulated prompt cache serves for a request, and remember its prefixes.
+
+    Args:
+        body (dict): The decoded request body
+
+    Returns:
+        int: Cached prompt tokens
+    """
+    digest = hashlib.sha256(body["model"].encode("utf-8"))
+    prefixes = []
+    tokens = 0
+    cached_tokens = 0
+    with _prompt_prefix_lock:
+        for message in body["messages"]:
+            digest.update(json.dumps(message, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            tokens += len(message["content"]) // 4 + 4
+            prefix = digest.hexdigest()
+            if prefix in _prompt_prefixes:
+                cached_tokens = tokens
+            prefixes.append(prefix)
+
+        if len(_prompt_prefixes) > PROMPT_CACHE_MAX_PREFIXES:
+            _prompt_prefixes.clear()
+        _prompt_prefixes.update(prefixes)
+
+    if cached_tokens < PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    return cached_tokens // PROMPT_CACHE_BLOCK_TOKENS * PROMPT_CACHE_BLOCK_TOKENS
+
+def build_completion(body, content):
+    """
+    Build a chat completion response body.
+
+    Args:
+        body (dict): The decoded request body
+        content (str): The response text
+
+    Returns:
+        dict: Completion in the chat completions API format
+    """
+    prompt_tokens = sum(len(message["content"]) // 4 + 4 for message in body["messages"])
+    completion_tokens = len(content) // 4 + 1
+    return {
+        "id": f"chatcmpl-fake-{random.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": get_cached_prompt_tokens(body)}
+        }
+    }
+
+def build_stream_events(body, content):
+    """
+    Split a response into server-sent events as the streaming API sends them.
+
+    Args:
+        body (dict): The decoded request body
+        content (str): The response text
+
+    Returns:
+        list: Event strings, ending with the usage chunk and [DONE]
+    """
+    completion = build_completion(body, content)
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"], "model": body["model"]}
+
+    events = []
+    pieces = [piece + " " for piece in content.split(" ")]
+    pieces[-1] = pieces[-1][:-1]
+    for index, piece in enumerate(pieces):
+        delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+        events.append(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}], usage=None))
+    events.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=None))
+    events.append(dict(base, choices=[], usage=completion["usage"]))
+    return [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+
+def stream_with_delay(events):
+    """
+    Yield stream events with the configured delay between them.
+
+    Args:
+        events (list): Event strings
+
+    Yields:
+        bytes: Encoded events
+    """
+    for event in events:
+        if FAKE_BACKEND_CHUNK_DELAY:
+            time.sleep(FAKE_BACKEND_CHUNK_DELAY)
+        yield event.encode("utf-8")
+
+class FakeOpenAITransport(httpx.BaseTransport):
+    """httpx transport that answers OpenAI API requests locally."""
+
+    def __init__(self, mode=FAKE_BACKEND_MODE, cassette=FAKE_BACKEND_CASSETTE):
+        self.mode = mode
+        self.cassette = cassette
+        self.real_transport = httpx.HTTPTransport() if mode == "record" else None
+
+    def handle_request(self, request):
+        if request.method == "GET" and "/models/" in request.url.path:
+            model = request.url.path.rsplit("/", 1)[1]
+            return httpx.Response(200, json={"id": model, "object": "model", "created": 0, "owned_by": "fake"})
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": f"Not supported by the fake backend: {request.url.path}"}})
+
+        body = json.loads(request.read())
+        key = make_request_key(body)
+
+        if self.mode == "record":
+            return self.record(request, body, key)
+
+        delay = max(0.0, random.gauss(FAKE_BACKEND_LATENCY, FAKE_BACKEND_LATENCY_JITTER))
+        time.sleep(delay)
+
+        if random.random() < FAKE_BACKEND_ERROR_RATE:
+            return self.build_error()
+
+        recorded = load_cassette(self.cassette).get(key) if self.mode == "replay" else None
+        if recorded is not None:
+            if body.get("stream"):
+                events = [event + "\n\n" for event in recorded["body"].split("\n\n") if event.strip()]
+                return httpx.Response(
+                    recorded["status"], headers={"content-type": recorded["content_type"]}, content=stream_with_delay(events)
+                )
+            return httpx.Response(recorded["status"], headers={"content-type": recorded["content_type"]}, content=recorded["body"].encode("utf-8"))
+
+        content = synthesize_content(body)
+        if body.get("stream"):
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=stream_with_delay(build_stream_events(body, content)))
+        return httpx.Response(200, json=build_completion(body, content))
+
+    def record(self, request, body, key):
+        """
+        Forward a request to the real API and add its response to the cassette.
+
+        Args:
+            request (httpx.Request): The request
+            body (dict): The decoded request body
+            key (str): Request key from make_request_key
+
+        Returns:
+            httpx.Response: The real response, already read
+        """
+        response = self.real_transport.handle_request(request)
+        text = response.read().decode("utf-8")
+        content_type = response.headers.get("content-type", "application/json")
+        if response.status_code == 200:
+            save_interaction(self.cassette, key, body, {"status": response.status_code, "content_type": content_type, "body": text})
+
+        # The body is already decoded, so only pass on the headers the client needs
+        headers = {"content-type": content_type}
+        if "retry-after" in response.headers:
+            headers["retry-after"] = response.headers["retry-after"]
+        return httpx.Response(response.status_code, headers=headers, content=text.encode("utf-8"))
+
+    def build_error(self):
+        """
+        Build an injected failure, a rate limit or a server error.
+
+        Returns:
+            httpx.Response: The error response
+        """
+        if random.random() < FAKE_BACKEND_RATE_LIMIT_SHARE:
+            return httpx.Response(
+                429,
+                headers={"retry-after": str(FAKE_BACKEND_RETRY_AFTER)},
+                json={"error": {"message": "Rate limit reached (injected by the fake backend)", "type": "requests", "code": "rate_limit_exceeded"}}
+            )
+        return httpx.Response(500, json={"error": {"message": "Server error (injected by the fake backend)", "type": "server_error"}})
+
+    def close(self):
+        if self.real_transport is not None:
+            self.real_transport.close()
@@ -0,0 +1,197 @@
+"""
+ACME Questionnaire Bot - Hedged Requests
+
+Functions for cutting the tail latency of the conversation call. When the
+first request has not produced its first token within a percentile of recent
+first-token times, a duplicate is sent and whichever answers first is used;
+the other is cancelled and its response closed.
+
+The reads run on their own small pool, so a stalled request, which is what
+triggers a hedge, never holds a worker the auxiliary calls need.
+"""
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from services.ai_service import stream_ai_response
+from services.turn_pipeline import submit_call_on
+from config import (
+    HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_BUDGET, HEDGE_MAX_WORKERS
+)
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="acme-hedge")
+
+# Recent first-token times and hedge counters, shared by all sessions in the process
+_first_token_times = deque(maxlen=500)
+_hedge_stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0}
+_hedge_lock = threading.Lock()
+
+def get_hedge_delay():
+    """
+    Get how long to wait for the first token before sending a duplicate request.
+
+    Returns:
+        float: Seconds, the HEDGE_PERCENTILE of recent first-token times once there are enough samples
+    """
+    with _hedge_lock:
+        samples = sorted(_first_token_times)
+
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))
+    return max(HEDGE_MIN_DELAY, samples[index])
+
+def reserve_hedge():
+    """
+    Check the hedging budget and count a hedge if it allows one.
+
+    Returns:
+        bool: True if a duplicate request may be sent
+    """
+    with _hedge_lock:
+        if _hedge_stats["hedged"] + 1 > HEDGE_BUDGET * _hedge_stats["calls"]:
+            return False
+        _hedge_stats["hedged"] += 1
+        return True
+
+def close_quietly(close):
+    """
+    Close a response, ignoring errors from closing it while another thread reads it.
+
+    Args:
+        close (callable): Closes the response
+    """
+    try:
+        close()
+    except Exception as e:
+        print(f"Closing a cancelled stream failed: {e}")
+
+def read_stream(messages, purpose, reader_id, events, cancelled, closers):
+    """
+    Read a streamed response into a queue of events. Runs on a worker thread.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        purpose (str): Call type, selects the model settings from MODEL_ROUTES
+        reader_id (int): 0 for the first request, 1 for the hedge
+        events (queue.Queue): Receives (reader_id, 'chunk' | 'done' | 'error', value)
+        cancelled (threading.Event): Set when the other request won, before this response is closed
+        closers (list): Receives the function that closes this request's response at reader_id
+    """
+    def on_open(close):
+        closers[reader_id] = close
+        # Cancelled before the response was there to close
+        if cancelled.is_set():
+            close_quietly(close)
+
+    try:
+        for piece in stream_ai_response(messages, purpose, on_open=on_open, cancelled=cancelled):
+            if cancelled.is_set():
+                # Leaving the loop closes the stream and stops the generation
+                return
+            events.put((reader_id, "chunk", piece))
+        events.put((reader_id, "done", None))
+    except Exception as e:
+        if not cancelled.is_set():
+            events.put((reader_id, "error", e))
+
+def stream_hedged_response(messages, purpose="conversation"):
+    """
+    Stream a response, sending a duplicate request if the first one is slow to start.
+
+    The request that produces the first token wins and the other is cancelled
+    as soon as it yields its next chunk. Hedges are capped at HEDGE_BUDGET of
+    all calls so a general slowdown does not double the traffic.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        purpose (str): Call type, selects the model settings from MODEL_ROUTES
+
+    Yields:
+        str: Pieces of the AI's response text in the order they arrive
+
+    Raises:
+        AIServiceError: If every request sent failed
+    """
+    with _hedge_lock:
+        _hedge_stats["calls"] += 1
+
+    events = queue.Queue()
+    cancelled = [threading.Event(), threading.Event()]
+    closers = [None, None]
+    started = [time.monotonic()]
+    submit_call_on(_hedge_executor, read_stream, messages, purpose, 0, events, cancelled[0], closers)
+
+    hedge_at = started[0] + get_hedge_delay()
+    failed = set()
+    winner = None
+    try:
+        # Wait for the first token from either request
+        while winner is None:
+            timeout = None
+            if len(started) == 1:
+                timeout = max(0.0, hedge_at - time.monotonic())
+            try:
+                reader_id, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                if reserve_hedge():
+                    print(f"No first token after {time.monotonic() - started[0]:.2f}s, sending a hedged request")
+                    started.append(time.monotonic())
+                    submit_call_on(_hedge_executor, read_stream, messages, purpose, 1, events, cancelled[1], closers)
+                else:
+                    # Budget spent: stop waiting for the hedge point
+                    started.append(None)
+                continue
+
+            if kind == "error":
+                failed.add(reader_id)
+                # Give up only when no other request is still running
+                if len(failed) == len([start for start in started if start is not None]):
+                    raise value
+                continue
+
+            winner = reader_id
+            first_token_time = time.monotonic() - started[winner]
+            with _hedge_lock:
+                _first_token_times.append(first_token_time)
+                if len(started) == 2 and started[1] is not None:
+                    _hedge_stats["hedge_wins" if winner == 1 else "primary_wins"] += 1
+
+            if kind == "done":
+                return
+            yield value
+
+        # Relay the rest of the winner's stream
+        while True:
+            reader_id, kind, value = events.get()
+            if reader_id != winner:
+                continue
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        # Stops the loser, and the winner too if the caller stopped reading early. Closing the
+        # response frees its pooled connection now and ends the generation, even while the
+        # reader is still blocked waiting for its next chunk.
+        for reader_id, event in enumerate(cancelled):
+            event.set()
+            if closers[reader_id]:
+                close_quietly(closers[reader_id])
+
+def get_hedge_stats():
+    """
+    Get the hedging counters.
+
+    Returns:
+        dict: Calls, hedges sent, wins per request, hedge win rate and the current hedge delay
+    """
+    with _hedge_lock:
+        stats = dict(_hedge_stats)
+
+    decided = stats["hedge_wins"] + stats["primary_wins"]
+    stats["hedge_win_rate"] = stats["hedge_wins"] / decided if decided else 0.0
+    stats["hedge_delay"] = get_hedge_delay()
+    return stats
@@ -0,0 +1,154 @@
+"""
+ACME Questionnaire Bot - Rate Limiter
+
+Process-wide requests-per-minute and tokens-per-minute budgets for OpenAI
+calls, with an admission queue that lets user-facing calls go before
+auxiliary ones. Every session shares the same budgets.
+"""
+import time
+import heapq
+import itertools
+import threading
+from services.resilience import AIRateLimitError
+from config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_RPM, RATE_LIMIT_TPM, RATE_LIMIT_PRIORITIES,
+    RATE_LIMIT_MAX_WAIT, RATE_LIMIT_BUSY_WAIT, RATE_LIMIT_BUSY_WINDOW
+)
+
+# Token buckets refilled continuously at the per-minute rate, plus the queue of
+# waiting calls as a heap of (priority, arrival number). Lower priorities go first.
+_buckets = {
+    "requests": {"capacity": RATE_LIMIT_RPM, "level": RATE_LIMIT_RPM, "rate": RATE_LIMIT_RPM / 60},
+    "tokens": {"capacity": RATE_LIMIT_TPM, "level": RATE_LIMIT_TPM, "rate": RATE_LIMIT_TPM / 60}
+}
+_refilled_at = time.monotonic()
+_waiters = []
+_arrivals = itertools.count()
+_condition = threading.Condition()
+_stats = {"admitted": 0, "rejected": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0}
+# When the last call that waited longer than RATE_LIMIT_BUSY_WAIT was admitted, None if none has
+_last_long_wait_at = None
+
+def refill_buckets(now):
+    """
+    Top up the buckets for the time since the last refill. Call with the condition held.
+
+    Args:
+        now (float): Current time.monotonic()
+    """
+    global _refilled_at
+    elapsed = now - _refilled_at
+    for bucket in _buckets.values():
+        bucket["level"] = min(bucket["capacity"], bucket["level"] + bucket["rate"] * elapsed)
+    _refilled_at = now
+
+def get_shortfall(tokens):
+    """
+    Get how long until both buckets can cover a call. Call with the condition held.
+
+    Args:
+        tokens (int): Tokens the call will be charged
+
+    Returns:
+        float: Seconds to wait, 0 if the call can go now
+    """
+    requests_bucket = _buckets["requests"]
+    tokens_bucket = _buckets["tokens"]
+    return max(
+        0.0,
+        (1 - requests_bucket["level"]) / requests_bucket["rate"],
+        (tokens - tokens_bucket["level"]) / tokens_bucket["rate"]
+    )
+
+def acquire_capacity(purpose, tokens):
+    """
+    Wait until the shared budgets allow a call, then charge it.
+
+    Calls are admitted one at a time in priority order, oldest first within a
+    priority. Like OpenAI's own limiter, a call is charged its estimated prompt
+    tokens plus max_tokens.
+
+    Args:
+        purpose (str): Call type, selects the priority from RATE_LIMIT_PRIORITIES
+        tokens (int): Estimated prompt tokens plus max_tokens
+
+    Returns:
+        float: Seconds the call waited
+
+    Raises:
+        AIRateLimitError: If the call could not be admitted within RATE_LIMIT_MAX_WAIT
+    """
+    global _last_long_wait_at
+    if not RATE_LIMIT_ENABLED:
+        return 0.0
+
+    # A call larger than the whole bucket could never go, so cap its charge
+    tokens = min(tokens, RATE_LIMIT_TPM)
+    entry = (RATE_LIMIT_PRIORITIES.get(purpose, max(RATE_LIMIT_PRIORITIES.values())), next(_arrivals))
+    started = time.monotonic()
+    deadline = started + RATE_LIMIT_MAX_WAIT
+
+    with _condition:
+        heapq.heappush(_waiters, entry)
+        try:
+            while True:
+                now = time.monotonic()
+                refill_buckets(now)
+
+                timeout = deadline - now
+                if _waiters[0] == entry:
+                    shortfall = get_shortfall(tokens)
+                    if shortfall == 0:
+                        _buckets["requests"]["level"] -= 1
+                        _buckets["tokens"]["level"] -= tokens
+                        break
+                    timeout = min(timeout, shortfall)
+
+                if now >= deadline:
+                    _stats["rejected"] += 1
+                    raise AIRateLimitError(f"No capacity for the {purpose} call within {RATE_LIMIT_MAX_WAIT:.0f}s", purpose)
+                _condition.wait(timeout)
+        finally:
+            _waiters.remove(entry)
+            heapq.heapify(_waiters)
+            # The next call in line re-checks the budgets
+            _condition.notify_all()
+
+        waited = now - started
+        _stats["admitted"] += 1
+        _stats["total_wait"] += waited
+        _stats["max_wait"] = max(_stats["max_wait"], waited)
+        _stats["last_wait"] = waited
+        if waited > RATE_LIMIT_BUSY_WAIT:
+            _last_long_wait_at = now
+
+    if waited > RATE_LIMIT_BUSY_WAIT:
+        print(f"{purpose} call waited {waited:.1f}s for rate limit capacity")
+    return waited
+
+def get_rate_limit_stats():
+    """
+    Get the admission queue depth and wait times.
+
+    Returns:
+        dict: Queue depth, admitted and rejected counts, and average, longest and last wait in seconds
+    """
+    with _condition:
+        stats = dict(_stats)
+        stats["queue_depth"] = len(_waiters)
+
+    stats["average_wait"] = stats.pop("total_wait") / stats["admitted"] if stats["admitted"] else 0.0
+    return stats
+
+def is_busy():
+    """
+    Check whether calls are currently queueing for capacity.
+
+    Returns:
+        bool: True if calls are waiting, or a call waited longer than RATE_LIMIT_BUSY_WAIT
+            within the last RATE_LIMIT_BUSY_WINDOW seconds
+    """
+    with _condition:
+        if _waiters:
+            return True
+        return _last_long_wait_at is not None and time.monotonic() - _last_long_wait_at < RATE_LIMIT_BUSY_WINDOW
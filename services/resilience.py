@@ -0,0 +1,219 @@
+"""
+ACME Questionnaire Bot - Resilience
+
+Functions for retrying OpenAI calls with backoff, stopping calls to a failing
+model with a circuit breaker, and reporting failures as typed errors.
+"""
+import time
+import random
+import threading
+import httpx
+import openai
+from config import (
+    OPENAI_MAX_RETRIES, OPENAI_BACKOFF_BASE, OPENAI_BACKOFF_MAX, OPENAI_RETRY_AFTER_MAX,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_SECONDS
+)
+
+class AIServiceError(Exception):
+    """An OpenAI call failed and produced no usable response."""
+
+    def __init__(self, message, purpose=None):
+        super().__init__(message)
+        self.purpose = purpose
+
+class AIRateLimitError(AIServiceError):
+    """The API kept rejecting the call because of rate limits."""
+
+class AITimeoutError(AIServiceError):
+    """The call did not finish within its timeout."""
+
+class AIUnavailableError(AIServiceError):
+    """The circuit breaker is open, so the call was not attempted."""
+
+# Errors that come from the API or the connection to it. Anything else is a bug in
+# the calling code and is left to propagate instead of being reported as a failed call.
+API_ERRORS = (openai.APIError, httpx.HTTPError)
+
+# Circuit breaker state per model, shared by all sessions in the process.
+# Each entry holds the consecutive failure count and the time the circuit opened (None while closed).
+_circuits = {}
+_circuits_lock = threading.Lock()
+
+def is_retryable(error):
+    """
+    Check whether an OpenAI error is transient and worth retrying.
+
+    Args:
+        error (Exception): The error raised by the OpenAI client
+
+    Returns:
+        bool: True for rate limits, timeouts, connection problems and server errors
+    """
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, httpx.TransportError):
+        # Raised unwrapped while reading a streamed response
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def get_retry_after(error):
+    """
+    Read the wait the API asked for from a rate-limit response.
+
+    Args:
+        error (Exception): The error raised by the OpenAI client
+
+    Returns:
+        float: Seconds to wait, or None if the response did not say
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # Retry-After may also be an HTTP date; fall back to our own backoff
+        pass
+    return None
+
+def get_backoff_delay(attempt, error):
+    """
+    Get the wait before the next attempt, using exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of the attempt that just failed, starting at 0
+        error (Exception): The error raised by the OpenAI client
+
+    Returns:
+        float: Seconds to wait
+    """
+    delay = random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt))
+    retry_after = get_retry_after(error)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def to_service_error(error, purpose):
+    """
+    Convert an OpenAI client error into a typed service error.
+
+    Args:
+        error (Exception): The error raised by the OpenAI client
+        purpose (str): Call type that failed
+
+    Returns:
+        AIServiceError: The matching service error
+    """
+    if isinstance(error, AIServiceError):
+        return error
+    if isinstance(error, openai.RateLimitError):
+        return AIRateLimitError(f"Rate limited: {error}", purpose)
+    if isinstance(error, (openai.APITimeoutError, httpx.TimeoutException)):
+        return AITimeoutError(f"Timed out: {error}", purpose)
+    return AIServiceError(f"{type(error).__name__}: {error}", purpose)
+
+def check_circuit(name, purpose=None):
+    """
+    Make sure calls to a model are allowed.
+
+    Once the reset time has passed an open circuit lets calls through again;
+    the next failure reopens it straight away.
+
+    Args:
+        name (str): Circuit name, the model being called
+        purpose (str): Call type about to be made
+
+    Raises:
+        AIUnavailableError: If the circuit is open
+    """
+    with _circuits_lock:
+        circuit = _circuits.get(name)
+        if circuit is None or circuit["opened_at"] is None:
+            return
+        if time.monotonic() - circuit["opened_at"] < CIRCUIT_BREAKER_RESET_SECONDS:
+            raise AIUnavailableError(f"Calls to {name} are paused after repeated failures", purpose)
+        # Half-open: allow a trial call, one more failure opens the circuit again
+        circuit["opened_at"] = None
+        circuit["failures"] = CIRCUIT_BREAKER_FAILURE_THRESHOLD - 1
+
+def record_success(name):
+    """
+    Close the circuit for a model after a successful call.
+
+    Args:
+        name (str): Circuit name, the model that was called
+    """
+    with _circuits_lock:
+        _circuits.pop(name, None)
+
+def record_failure(name):
+    """
+    Count a transient failure for a model and open its circuit when there are too many in a row.
+
+    Args:
+        name (str): Circuit name, the model that was called
+    """
+    with _circuits_lock:
+        circuit = _circuits.setdefault(name, {"failures": 0, "opened_at": None})
+        circuit["failures"] += 1
+        if circuit["failures"] >= CIRCUIT_BREAKER_FAILURE_THRESHOLD and circuit["opened_at"] is None:
+            circuit["opened_at"] = time.monotonic()
+            print(f"Circuit for {name} opened after {circuit['failures']} consecutive failures")
+
+def get_circuit_states():
+    """
+    Get the state of every circuit that has seen failures.
+
+    Returns:
+        dict: Mapping of circuit name to {'failures', 'open'}
+    """
+    with _circuits_lock:
+        return {
+            name: {"failures": circuit["failures"], "open": circuit["opened_at"] is not None}
+            for name, circuit in _circuits.items()
+        }
+
+def call_with_retries(call, name, purpose):
+    """
+    Run an OpenAI call, retrying transient failures with jittered exponential backoff.
+
+    Args:
+        call (callable): Makes the request and returns its result
+        name (str): Circuit name, the model being called
+        purpose (str): Call type, reported in errors
+
+    Returns:
+        The result of the call
+
+    Raises:
+        AIServiceError: If the call failed, timed out, kept being rate limited or its circuit is open
+    """
+    attempt = 0
+    while True:
+        check_circuit(name, purpose)
+        try:
+            result = call()
+        except API_ERRORS as e:
+            if not is_retryable(e):
+                # The request itself is at fault; retrying would fail the same way
+                print(f"OpenAI {purpose} call failed: {e}")
+                raise to_service_error(e, purpose) from e
+
+            record_failure(name)
+            delay = get_backoff_delay(attempt, e)
+            if attempt >= OPENAI_MAX_RETRIES or delay > OPENAI_RETRY_AFTER_MAX:
+                print(f"OpenAI {purpose} call failed after {attempt + 1} attempts: {e}")
+                raise to_service_error(e, purpose) from e
+
+            print(f"OpenAI {purpose} call failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        record_success(name)
+        return result
@@ -0,0 +1,170 @@
+"""
+ACME Questionnaire Bot - Response Cache
+
+Content-addressed cache for AI responses, shared by all sessions in the process.
+An in-memory LRU sits in front of an on-disk SQLite store.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config import (
+    RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MEMORY_ENTRIES, RESPONSE_CACHE_DISK_ENTRIES
+)
+
+# Completion arguments that only affect how the request is made, not its response
+NON_RESPONSE_ARGS = ("timeout",)
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+_disk_connection = None
+_disk_lock = threading.Lock()
+_disk_writes = 0
+
+def make_cache_key(completion_args):
+    """
+    Build the cache key for a request from everything that determines its response.
+    
+    Every completion argument is part of the key except those in
+    NON_RESPONSE_ARGS, so a new route option such as stop cannot be left out.
+    
+    Args:
+        completion_args (dict): Arguments from build_completion_args
+        
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps(
+        {name: value for name, value in completion_args.items() if name not in NON_RESPONSE_ARGS},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_disk_connection():
+    """
+    Open the SQLite store on first use.
+    
+    Returns:
+        sqlite3.Connection: Connection to the store, or None if disk caching is disabled or unavailable
+    """
+    global _disk_connection
+    if _disk_connection is None and RESPONSE_CACHE_PATH:
+        try:
+            directory = os.path.dirname(RESPONSE_CACHE_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(RESPONSE_CACHE_PATH, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            connection.commit()
+            _disk_connection = connection
+        except sqlite3.Error as e:
+            print(f"Response cache disk store unavailable: {e}")
+    return _disk_connection
+
+def get_cached_response(key):
+    """
+    Look up a cached response.
+    
+    Args:
+        key (str): Cache key from make_cache_key
+        
+    Returns:
+        str: The cached response, or None if missing or expired
+    """
+    now = time.time()
+    
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            response, created_at = entry
+            if now - created_at <= RESPONSE_CACHE_TTL:
+                _memory_cache.move_to_end(key)
+                return response
+            del _memory_cache[key]
+    
+    with _disk_lock:
+        connection = get_disk_connection()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > RESPONSE_CACHE_TTL:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            connection.commit()
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            return None
+    
+    # Promote disk hits to the memory tier
+    store_in_memory(key, response, created_at)
+    return response
+
+def store_in_memory(key, response, created_at):
+    """Add an entry to the memory tier, evicting the least recently used entries."""
+    with _memory_lock:
+        _memory_cache[key] = (response, created_at)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > RESPONSE_CACHE_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+def set_cached_response(key, response):
+    """
+    Store a response in both cache tiers.
+    
+    Args:
+        key (str): Cache key from make_cache_key
+        response (str): The response to cache
+    """
+    global _disk_writes
+    now = time.time()
+    store_in_memory(key, response, now)
+    
+    with _disk_lock:
+        connection = get_disk_connection()
+        if connection is None:
+            return
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            _disk_writes += 1
+            
+            # Prune expired entries and enforce the size limit every so often
+            if _disk_writes % 100 == 0:
+                connection.execute("DELETE FROM responses WHERE created_at < ?", (now - RESPONSE_CACHE_TTL,))
+                connection.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (RESPONSE_CACHE_DISK_ENTRIES,)
+                )
+            connection.commit()
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+
+def clear_response_cache():
+    """Remove every entry from both cache tiers."""
+    with _memory_lock:
+        _memory_cache.clear()
+    with _disk_lock:
+        connection = get_disk_connection()
+        if connection is not None:
+            connection.execute("DELETE FROM responses")
+            connection.commit()
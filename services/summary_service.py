@@ -6,6 +6,7 @@ Functions for generating summaries of the conversation.
 import streamlit as st
 from datetime import datetime
 from collections import OrderedDict
+from utils.file_loader import get_session_questionnaire, get_section_for_text
 from config import TOPIC_AREAS
 
 def generate_conversation_summary():
@@ -69,67 +70,14 @@ def generate_conversation_summary():
     
     summary += "## Questionnaire Responses\n\n"
     
-    # Categorizing responses based on sections from the ACME template
-    section_mapping = {
-        "crew": "Section 1: Crew Manager Usage",
-        "daily crew": "Section 1: Crew Manager Usage",
-        "daily resource": "Section 1: Crew Manager Usage",
-        "work assignments": "Section 1: Crew Manager Usage",
-        "situation": "Section 1: Crew Manager Usage",
-        
-        "mutual assistance": "Section 2: Emergency and Contract Operations",
-        "contract crews": "Section 2: Emergency and Contract Operations",
-        "lodging": "Section 2: Emergency and Contract Operations",
-        "emergency": "Section 2: Emergency and Contract Operations",
-        
-        "additional crew": "Section 3: Resources and Reporting",
-        "tracking crew": "Section 3: Resources and Reporting",
-        "crew manager usage": "Section 3: Resources and Reporting",
-        "resources": "Section 3: Resources and Reporting",
-        "availability": "Section 3: Resources and Reporting",
-        
-        "current crew": "Section 4: Current Practices and Needs",
-        "crew management reporting": "Section 4: Current Practices and Needs",
-        "data organization": "Section 4: Current Practices and Needs",
-        "reports": "Section 4: Current Practices and Needs",
-        "tools": "Section 4: Current Practices and Needs"
-    }
-    
-    # Define the preferred order of sections
-    section_order = [
-        "Section 1: Crew Manager Usage", 
-        "Section 2: Emergency and Contract Operations", 
-        "Section 3: Resources and Reporting", 
-        "Section 4: Current Practices and Needs",
-        "Other"
-    ]
-    
-    # Initialize ordered dict with empty lists for each section
-    section_buckets = OrderedDict()
-    for section in section_order:
-        section_buckets[section] = []
-    
-    # Add "Other" for anything that doesn't match
+    # Group responses by the section of their scripted question
+    questionnaire = get_session_questionnaire()
+    section_buckets = OrderedDict((title, []) for title in questionnaire.section_titles.values())
     section_buckets["Other"] = []
     
-    # Improved categorization algorithm
     for question, answer in summary_pairs:
-        section_assigned = False
-        
-        # Combine question and answer text for better matching
-        combined_text = (question + " " + answer).lower()
-        
-        # Find the best matching section
-        for keyword, section in section_mapping.items():
-            if keyword.lower() in combined_text:
-                # If we find a match, assign to this section
-                section_buckets[section].append((question, answer))
-                section_assigned = True
-                break
-        
-        # If no match found, assign to "Other"
-        if not section_assigned:
-            section_buckets["Other"].append((question, answer))
+        section = get_section_for_text(question, questionnaire)
+        section_buckets[questionnaire.section_titles[section] if section else "Other"].append((question, answer))
     
     # Add sections to summary
     for section, qa_pairs in section_buckets.items():
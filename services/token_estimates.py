@@ -0,0 +1,47 @@
+"""
+ACME Questionnaire Bot - Token Estimates
+
+Functions for estimating the token count of texts and request messages, used
+to budget the request context and to charge calls against the rate limits.
+"""
+
+# Per-message overhead of the chat format, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a text.
+    
+    Uses tiktoken when it is installed and falls back to about four characters per token.
+    
+    Args:
+        text (str): The text to measure
+        
+    Returns:
+        int: Estimated token count
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except (ImportError, ModuleNotFoundError):
+            _encoding = False
+    
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def estimate_message_tokens(messages):
+    """
+    Estimate the number of tokens in a list of messages.
+    
+    Args:
+        messages (list): List of message dictionaries with role and content
+        
+    Returns:
+        int: Estimated token count
+    """
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
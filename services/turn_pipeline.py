@@ -0,0 +1,92 @@
+"""
+ACME Questionnaire Bot - Turn Pipeline
+
+Functions for running the independent LLM calls of a turn concurrently.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import TURN_PIPELINE_MAX_WORKERS
+
+# Worker pool shared by all sessions in the process, and the calls not finished yet
+_executor = ThreadPoolExecutor(max_workers=TURN_PIPELINE_MAX_WORKERS, thread_name_prefix="acme-turn")
+_pending_calls = set()
+_pending_lock = threading.Lock()
+
+def forget_call(future):
+    """
+    Remove a finished call from the pending set.
+    
+    Args:
+        future (Future): The finished call
+    """
+    with _pending_lock:
+        _pending_calls.discard(future)
+
+def submit_call(func, *args, **kwargs):
+    """
+    Start a call on the shared worker pool.
+    
+    The call runs outside the Streamlit script thread, so it must not read or
+    write st.session_state; pass everything it needs as arguments.
+    
+    Args:
+        func (callable): The function to run
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+        
+    Returns:
+        Future: Future for the call's result
+    """
+    return submit_call_on(_executor, func, *args, **kwargs)
+
+def submit_call_on(executor, func, *args, **kwargs):
+    """
+    Start a call on a given worker pool, tracked like the calls from submit_call.
+    
+    Args:
+        executor (ThreadPoolExecutor): The pool to run the call on
+        func (callable): The function to run
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+        
+    Returns:
+        Future: Future for the call's result
+    """
+    future = executor.submit(func, *args, **kwargs)
+    with _pending_lock:
+        _pending_calls.add(future)
+    future.add_done_callback(forget_call)
+    return future
+
+def join_calls(futures):
+    """
+    Wait for a set of started calls and collect their results.
+    
+    Args:
+        futures (dict): Mapping of call name to Future
+        
+    Returns:
+        dict: Mapping of call name to result, or None if the call failed
+    """
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"Concurrent call '{name}' failed: {e}")
+            results[name] = None
+    return results
+
+def wait_for_pending_calls(timeout=None):
+    """
+    Wait until every call started so far, including background prefetches, has finished.
+    
+    Args:
+        timeout (float): Longest wait in seconds, None waits indefinitely
+        
+    Returns:
+        bool: True if all calls finished, False if the timeout passed first
+    """
+    with _pending_lock:
+        pending = list(_pending_calls)
+    return not wait(pending, timeout=timeout).not_done
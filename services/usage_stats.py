@@ -0,0 +1,68 @@
+"""
+ACME Questionnaire Bot - Usage Statistics
+
+Process-wide token usage counters per call type, including the prompt tokens
+served from the provider's prompt cache.
+"""
+import threading
+from config import USAGE_LOG_EVERY
+
+_usage = {}
+_usage_lock = threading.Lock()
+_calls_since_log = 0
+
+def record_usage(purpose, usage):
+    """
+    Add the token usage of one API call to the counters.
+    
+    Args:
+        purpose (str): Call type, e.g. 'conversation' or 'topic_check'
+        usage: The 'usage' object from the API response, may be None
+    """
+    if usage is None:
+        return
+    
+    global _calls_since_log
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    
+    with _usage_lock:
+        totals = _usage.setdefault(purpose, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+        totals["calls"] += 1
+        totals["prompt_tokens"] += usage.prompt_tokens or 0
+        totals["cached_tokens"] += cached_tokens
+        totals["completion_tokens"] += usage.completion_tokens or 0
+        _calls_since_log += 1
+        due = USAGE_LOG_EVERY and _calls_since_log >= USAGE_LOG_EVERY
+        if due:
+            _calls_since_log = 0
+    
+    if due:
+        log_usage_stats()
+
+def get_usage_stats():
+    """
+    Get the token usage counters per call type.
+    
+    Returns:
+        dict: Mapping of call type to counters, including the prompt cache hit rate
+    """
+    with _usage_lock:
+        stats = {purpose: dict(totals) for purpose, totals in _usage.items()}
+    
+    for totals in stats.values():
+        totals["cache_hit_rate"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+    return stats
+
+def log_usage_stats():
+    """Print the calls, prompt tokens and prompt cache hit rate of each call type."""
+    for purpose, totals in sorted(get_usage_stats().items()):
+        print(
+            f"Usage {purpose}: {totals['calls']} calls, {totals['prompt_tokens']} prompt tokens, "
+            f"{totals['cached_tokens']} cached ({totals['cache_hit_rate']:.0%})"
+        )
+
+def reset_usage_stats():
+    """Clear all usage counters."""
+    with _usage_lock:
+        _usage.clear()
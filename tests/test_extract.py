@@ -0,0 +1,35 @@
+"""
+ACME Questionnaire Bot - Tests for local name and organization extraction
+"""
+import pytest
+from utils.extract import extract_user_info_locally
+from config import USER_INFO_CONFIDENCE_THRESHOLD
+
+@pytest.mark.parametrize("user_input, name, company", [
+    ("My name is Jane Doe and I work at Acme Power", "Jane Doe", "Acme Power"),
+    ("Jane Doe from Northwind Power and Light", "Jane Doe", "Northwind Power and Light"),
+    ("Name: Jane Doe, Organization: Acme", "Jane Doe", "Acme"),
+    ("Jane Doe - Acme", "Jane Doe", "Acme"),
+    ("John Smith at Acme, thanks", "John Smith", "Acme"),
+    ("Jane Doe from Acme. We are a utility", "Jane Doe", "Acme"),
+    ("Jan de Vries from Acme Inc. We are a utility", "Jan de Vries", "Acme Inc"),
+])
+def test_clear_answers_are_accepted(user_input, name, company):
+    extracted, confidence = extract_user_info_locally(user_input)
+    assert extracted == {"name": name, "company": company}
+    assert confidence >= USER_INFO_CONFIDENCE_THRESHOLD
+
+@pytest.mark.parametrize("user_input", [
+    "Hi, Jane here",
+    "Sure, Jane Doe - Acme",
+    "Jane Doe, Operations Manager",
+    "Ok, Acme",
+    "jane, acme",
+    "I'm with Acme Power",
+    "Jane Doe, I work for Acme",
+    "I am Jane Doe, a dispatcher at Acme",
+    "jane doe from acme",
+])
+def test_doubtful_answers_go_to_the_model(user_input):
+    _, confidence = extract_user_info_locally(user_input)
+    assert confidence < USER_INFO_CONFIDENCE_THRESHOLD
@@ -0,0 +1,52 @@
+"""
+ACME Questionnaire Bot - Tests for the local intent rules and model
+"""
+import pytest
+from utils.intent_classifier import apply_rules, classify_intent_locally
+
+@pytest.mark.parametrize("text", [
+    "Can you explain?",
+    "Could you please clarify that",
+    "Please explain",
+    "explain that question",
+    "Clarify what you mean",
+    "I don't understand",
+    "help",
+])
+def test_requests_for_help_are_questions(text):
+    assert apply_rules(text) == ("QUESTION", 0.95)
+
+@pytest.mark.parametrize("text", [
+    "Our supervisors explain the assignments every morning",
+    "We clarify the schedule with crew leads by phone",
+])
+def test_answers_using_help_verbs_are_not_questions(text):
+    assert apply_rules(text) is None
+
+@pytest.mark.parametrize("text", [
+    "i dont get it",
+    "say that again",
+    "not clear",
+    "this is unclear",
+    "tell me more",
+    "give me some examples",
+    "Sorry, I do not follow",
+])
+def test_unclear_replies_are_never_local_answers(text):
+    assert classify_intent_locally(text) != "ANSWER"
+
+@pytest.mark.parametrize("text", [
+    "pardon",
+    "go on",
+    "more info please",
+])
+def test_short_replies_the_model_calls_answers_go_to_the_llm(text):
+    assert classify_intent_locally(text) is None
+
+@pytest.mark.parametrize("text", [
+    "We do not follow a fixed schedule for lodging assignments",
+    "For example, we keep a shared spreadsheet of crews and their trucks",
+    "Our supervisors assign crews every morning from a shared spreadsheet",
+])
+def test_clear_answers_stay_local(text):
+    assert classify_intent_locally(text) == "ANSWER"
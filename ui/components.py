@@ -5,6 +5,7 @@ Reusable UI components for the application.
 """
 import streamlit as st
 from services.summary_service import generate_conversation_summary
+from config import BACKGROUND_POLL_INTERVAL
 
 def display_chat_history():
     """Display the chat history in the UI."""
@@ -59,20 +60,45 @@ def display_chat_history():
 
             # REGULAR ASSISTANT MESSAGE
             else:
-                st.markdown(
-                    f"""
-                    <div style="display: flex; margin-bottom: 10px;">
-                      <div style="background-color: #f0f2f6; border-radius: 15px 15px 15px 0; padding: 10px 15px; max-width: 80%; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);">
-                        <p style="margin: 0; color: #333;"><strong>Assistant</strong></p>
-                        <p style="margin: 0; white-space: pre-wrap;">{content}</p>
-                      </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+                st.markdown(assistant_message_html(content), unsafe_allow_html=True)
+    
+    # STREAMING ASSISTANT MESSAGE
+    # A reply is pending for the last user message; render it as it arrives
+    if st.session_state.get("pending_response"):
+        from utils.session import complete_pending_response
+        placeholder = st.empty()
+        complete_pending_response(
+            lambda text: placeholder.markdown(assistant_message_html(text + "▌"), unsafe_allow_html=True)
+        )
+
+def assistant_message_html(content):
+    """
+    Build the chat bubble markup for a regular assistant message.
+    
+    Args:
+        content (str): The message text
+        
+    Returns:
+        str: HTML for the message bubble
+    """
+    return f"""
+    <div style="display: flex; margin-bottom: 10px;">
+      <div style="background-color: #f0f2f6; border-radius: 15px 15px 15px 0; padding: 10px 15px; max-width: 80%; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);">
+        <p style="margin: 0; color: #333;"><strong>Assistant</strong></p>
+        <p style="margin: 0; white-space: pre-wrap;">{content}</p>
+      </div>
+    </div>
+    """
 
 def create_input_form():
     """Create the input form for user responses."""
+    from services.rate_limiter import is_busy
+    from utils.session import handle_due_summary_request
+    
+    # Tell the user replies are slow instead of letting them think the app hangs
+    if is_busy():
+        st.info("The assistant is busy right now, so replies may take a little longer than usual.")
+    
     with st.form(key='chat_form', clear_on_submit=True):
         user_input = st.text_input("Your response:", placeholder="Type your response or ask a question...")
         submit_button = st.form_submit_button("Send")
@@ -90,35 +116,26 @@ def create_input_form():
         # Handle help button
         if help_button:
             handle_help_request()
+            handle_due_summary_request()
             st.rerun()
             
         # Handle example button
         if example_button:
             handle_example_request()
+            handle_due_summary_request()
             st.rerun()
     
     return user_input, submit_button
 
 def handle_help_request():
     """Handle a help request from the user."""
-    from services.ai_service import get_ai_response
-    
-    # Get the current question context from the most recent assistant message
-    last_question = None
-    for msg in reversed(st.session_state.visible_messages):
-        if msg["role"] == "assistant" and "?" in msg["content"]:
-            last_question = msg["content"]
-            break
+    from services.assist_service import get_assist
+    from utils.session import apply_background_results
     
-    # Create help message context with clear instructions
-    help_messages = st.session_state.chat_history.copy()
-    help_messages.append({
-        "role": "system", 
-        "content": f"The user is asking for help with the CURRENT question which is: '{last_question}'. Provide a helpful explanation specifically for THIS question, not a previous one."
-    })
-    help_messages.append({"role": "user", "content": "I need help with this question"})
+    # Make sure help is for the question the user is on now
+    apply_background_results(wait=True)
     
-    help_response = get_ai_response(help_messages)
+    help_response = get_assist("help")
     
     # Add help interaction to chat history without advancing question
     st.session_state.chat_history.append({"role": "user", "content": "I need help with this question"})
@@ -130,33 +147,14 @@ def handle_help_request():
 
 def handle_example_request():
     """Handle an example request from the user."""
-    from services.ai_service import get_ai_response
-    
-    # Extract the last assistant message to see what was actually asked
-    last_assistant_message = None
-    for msg in reversed(st.session_state.visible_messages):
-        if msg["role"] == "assistant":
-            last_assistant_message = msg["content"]
-            break
-    
-    example_messages = st.session_state.chat_history.copy()
-    
-    # Add a system message that ensures the example is for the CURRENT question
-    example_messages.append({
-        "role": "system", 
-        "content": f"""
-        Provide ONLY an example answer for the LAST question you asked, which was: 
-        "{last_assistant_message}"
-        
-        The example MUST be directly relevant to what you just asked the user.
-        Format your response exactly as: *"Example: [your example here]"*
-        
-        After the example, repeat the last question verbatim so the user knows what to answer.
-        """
-    })
+    from services.assist_service import get_assist
+    from utils.session import apply_background_results
+    
+    # Make sure the example is for the question the user is on now
+    apply_background_results(wait=True)
     
     # Get the example response
-    example_response = get_ai_response(example_messages)
+    example_response = get_assist("example")
     
     # Add to chat history
     st.session_state.chat_history.append({"role": "user", "content": "Can you show me an example?"})
@@ -166,6 +164,26 @@ def handle_example_request():
         {"role": "assistant", "content": example_response}
     ])
 
+def apply_finished_background_work():
+    """Apply background results as they finish while the user reads the reply."""
+    from utils.session import apply_background_results, handle_due_summary_request
+    
+    # Rerun the whole app so the progress bar and chat show the new state
+    if apply_background_results():
+        handle_due_summary_request()
+        st.rerun()
+
+# Where Streamlit supports fragments, the poll reruns on its own without waiting for user input
+if hasattr(st, "fragment"):
+    apply_finished_background_work = st.fragment(run_every=BACKGROUND_POLL_INTERVAL)(apply_finished_background_work)
+
+def poll_background_work():
+    """Keep applying background results while any are queued."""
+    # Only mounted while there is work, so idle sessions do not rerun every interval.
+    # The rerun after the last result is applied leaves it unmounted.
+    if st.session_state.get("background_work"):
+        apply_finished_background_work()
+
 def display_completion_summary():
     """Display the completion summary when the questionnaire is finished."""
     if not st.session_state.get("summary_requested", False):
@@ -0,0 +1,126 @@
+"""
+ACME Questionnaire Bot - Context Window
+
+Functions for building a token-budgeted request context from the chat history.
+The system prompt and the most recent exchanges are sent verbatim; older
+exchanges are folded into a compact summary of the answers already collected.
+Volatile messages always go after the history so the request prefix stays stable.
+"""
+import streamlit as st
+from services.token_estimates import estimate_message_tokens
+from utils.guidance import get_guidance_messages
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_RECENT_EXCHANGES, CONTEXT_FOLD_BLOCK, CONTEXT_SUMMARY_ANSWER_CHARS
+
+def split_exchanges(messages):
+    """
+    Group messages into exchanges, each starting at a user message.
+    
+    Args:
+        messages (list): Messages after the system prompt
+        
+    Returns:
+        list: List of message lists
+    """
+    exchanges = []
+    for message in messages:
+        if message["role"] == "user" or not exchanges:
+            exchanges.append([])
+        exchanges[-1].append(message)
+    return exchanges
+
+def build_summary_message(responses, user_info, answer_limit):
+    """
+    Build the rolling summary that stands in for folded exchanges.
+    
+    Args:
+        responses (list): List of (question, answer) tuples collected so far
+        user_info (dict): Dictionary with name and company
+        answer_limit (int): Number of most recent answers to include
+        
+    Returns:
+        dict: System message with the summary
+    """
+    lines = ["Summary of the earlier conversation (older messages are omitted to save space):"]
+    
+    if user_info.get("name") or user_info.get("company"):
+        lines.append(f"User: {user_info.get('name') or 'name not provided'}, organization: {user_info.get('company') or 'not provided'}.")
+    
+    included = responses[-answer_limit:] if answer_limit else []
+    if included:
+        lines.append("Answers already collected (do not ask these again):")
+        for question, answer in included:
+            if len(answer) > CONTEXT_SUMMARY_ANSWER_CHARS:
+                answer = answer[:CONTEXT_SUMMARY_ANSWER_CHARS].rstrip() + "..."
+            lines.append(f"- Q: {question} A: {answer}")
+    
+    return {"role": "system", "content": "\n".join(lines)}
+
+def build_context_messages(chat_history, responses, user_info, guidance=None, tail=None, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Build the messages for a conversation request within a token budget.
+    
+    The layout keeps a stable prefix so the provider's prompt cache can reuse it:
+    the system prompt, then the frozen history, then everything that changes from
+    request to request (rolling summary, guidance and call-specific instructions).
+    Exchanges are folded in blocks so the retained history only shifts every few turns.
+    
+    Does not touch the session state, so it can run on a worker thread.
+    
+    Args:
+        chat_history (list): Full chat history, starting with the system prompt
+        responses (list): List of (question, answer) tuples collected so far
+        user_info (dict): Dictionary with name and company
+        guidance (list): Guidance system messages
+        tail (list): Call-specific messages that go last
+        token_budget (int): Maximum estimated tokens for the returned messages
+        
+    Returns:
+        list: Messages to send
+    """
+    if not chat_history:
+        return []
+    
+    volatile = (guidance or []) + (tail or [])
+    if estimate_message_tokens(chat_history) + estimate_message_tokens(volatile) <= token_budget:
+        return list(chat_history) + volatile
+    
+    system_prompt = chat_history[0]
+    exchanges = split_exchanges(chat_history[1:])
+    
+    # Fold whole blocks of exchanges, keeping at least the most recent ones verbatim
+    foldable = max(len(exchanges) - CONTEXT_RECENT_EXCHANGES, 0)
+    kept = exchanges[foldable - foldable % CONTEXT_FOLD_BLOCK:]
+    answer_limit = len(responses)
+    
+    # If that is still over budget, drop the oldest answers from the summary,
+    # and only then fold recent exchanges too
+    while True:
+        summary = build_summary_message(responses, user_info, answer_limit)
+        history = [message for exchange in kept for message in exchange]
+        messages = [system_prompt] + history + [summary] + volatile
+        if estimate_message_tokens(messages) <= token_budget:
+            return messages
+        if answer_limit > 0:
+            answer_limit -= 1
+        elif len(kept) > 1:
+            kept = kept[1:]
+        else:
+            return messages
+
+def get_context_messages(tail=None):
+    """
+    Build the token-budgeted messages for a conversation request from the session.
+    
+    Args:
+        tail (list): Call-specific messages that go last
+    
+    Returns:
+        list: Messages to send
+    """
+    return build_context_messages(
+        st.session_state.chat_history,
+        st.session_state.get("responses", []),
+        st.session_state.get("user_info", {}),
+        get_guidance_messages(),
+        tail
+    )
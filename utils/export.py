@@ -207,37 +207,22 @@ def generate_pdf(answers, user_info):
                 
             elements.append(Spacer(1, 0.3*inch))
         
-        # Group answers by section
-        from collections import defaultdict
-        section_answers = defaultdict(list)
-        
-        # Simple section detection based on keywords
-        section_keywords = {
-            "Section 1: Crew Manager Usage": ["crew manager", "daily crew", "resource", "work assignment", "situations"],
-            "Section 2: Emergency and Contract Operations": ["mutual", "assistance", "contract", "lodging", "emergency"],
-            "Section 3: Resources and Reporting": ["additional crew", "tracking", "availability", "roles", "using crew manager"],
-            "Section 4: Current Practices and Needs": ["current tools", "reports", "data", "organized", "filtered"]
-        }
+        # Group answers by the section of their scripted question
+        from utils.file_loader import get_session_questionnaire, get_section_for_text
+        questionnaire = get_session_questionnaire()
+        section_answers = {title: [] for title in questionnaire.section_titles.values()}
+        section_answers["Other"] = []
         
         for question, answer in answers:
-            # Determine which section this belongs to
-            assigned_section = "Other"
-            
-            # Check each section's keywords
-            for section, keywords in section_keywords.items():
-                if any(keyword.lower() in question.lower() for keyword in keywords):
-                    assigned_section = section
-                    break
-                    
-            section_answers[assigned_section].append((question, answer))
+            section = get_section_for_text(question, questionnaire)
+            section_answers[questionnaire.section_titles[section] if section else "Other"].append((question, answer))
         
         # Add responses by section
-        for section in ["Section 1: Crew Manager Usage", "Section 2: Emergency and Contract Operations", 
-                        "Section 3: Resources and Reporting", "Section 4: Current Practices and Needs", "Other"]:
-            if section in section_answers and section_answers[section]:
+        for section, qa_pairs in section_answers.items():
+            if qa_pairs:
                 elements.append(Paragraph(section, section_style))
                 
-                for question, answer in section_answers[section]:
+                for question, answer in qa_pairs:
                     elements.append(Paragraph(f"Q: {question}", question_style))
                     elements.append(Paragraph(f"A: {answer}", answer_style))
                 
@@ -3,8 +3,54 @@ ACME Questionnaire Bot - Extraction Utilities
 
 Functions for extracting information from user responses.
 """
+import re
 import streamlit as st
 from services.ai_service import get_ai_response
+from services.resilience import AIServiceError
+from utils.guidance import set_guidance, clear_guidance
+from config import USER_INFO_CONFIDENCE_THRESHOLD
+
+# Patterns for answers to the name/organization question, with the confidence each one carries
+# and whether the parts are only split by punctuation. Phrased patterns are tried before bare separators.
+NAME_ORGANIZATION_PATTERNS = [
+    (r"^name\s*[:=]\s*(?P<name>.+?)\s*[,;]?\s*(?:organization|organisation|company)\s*[:=]\s*(?P<company>.+)$", 0.95, False),
+    (r"^(?:hi|hello|hey)?[,!. ]*(?:my name is|i am|i'm|im|this is|it's|its)\s+(?P<name>.+?)\s*,?\s+(?:and\s+)?(?:i\s+)?(?:work|am|i'm)?\s*(?:from|at|with|for|of)\s+(?P<company>.+)$", 0.9, False),
+    (r"^(?:my name is|i am|i'm|im|this is)\s+(?P<name>[^,;/]+?)\s*[,;/-]\s*(?P<company>.+)$", 0.85, True),
+    (r"^(?P<name>[^,;/]+?)\s+(?:from|at|with|of)\s+(?P<company>.+)$", 0.8, False),
+    (r"^(?P<name>[^,;/]+?)\s*(?:,|;|/|\s-\s|\|)\s*(?P<company>.+)$", 0.8, True),
+]
+
+# A split by punctuation alone stays below USER_INFO_CONFIDENCE_THRESHOLD unless both parts look right
+SEPARATOR_ONLY_CONFIDENCE = 0.7
+
+# Words that suggest the text is not a person's name
+NOT_NAME_WORDS = {
+    "we", "our", "the", "use", "using", "yes", "no", "not", "company", "organization", "team",
+    "hi", "hello", "hey", "sure", "ok", "okay", "yeah", "yep", "thanks", "here", "name",
+    "i", "i'm", "im", "with"
+}
+
+# Lowercase words that can still be part of a name, as in 'Jan de Vries'
+NAME_PARTICLES = {"de", "van", "von", "der", "den", "da", "di", "du", "la", "le", "del", "dos", "bin", "al"}
+
+# First words that make an 'organization' the start of a sentence instead, as in 'I work for Acme'
+NOT_COMPANY_START_WORDS = {
+    "i", "i'm", "im", "we", "we're", "were", "our", "my", "you", "it", "it's", "its", "this", "that",
+    "work", "working", "am", "are", "is"
+}
+
+# Abbreviations whose period is part of a company name rather than a sentence break
+COMPANY_ABBREVIATIONS = {"inc", "co", "corp", "ltd", "llc"}
+
+# Pleasantries after the organization, as in 'Acme, thanks'
+TRAILING_PLEASANTRY_PATTERN = r"[\s,;-]*\b(?:thanks|thank you|thx|cheers|regards|please)\W*$"
+
+# Words that make an 'organization' a job title instead
+JOB_TITLE_WORDS = {
+    "manager", "director", "supervisor", "engineer", "coordinator", "lead", "foreman", "dispatcher",
+    "analyst", "specialist", "administrator", "officer", "president", "vp", "head", "superintendent",
+    "planner", "technician", "ceo", "cto", "cio", "coo"
+}
 
 def extract_user_info(user_input):
     """
@@ -16,18 +62,107 @@ def extract_user_info(user_input):
     Returns:
         dict: Dictionary with name and company information
     """
+    extracted, confidence = extract_user_info_locally(user_input)
+    if confidence < USER_INFO_CONFIDENCE_THRESHOLD:
+        extracted = request_user_info(user_input)
+    return apply_user_info(extracted)
+
+def extract_user_info_locally(user_input):
+    """
+    Extract user name and company from the first response without an AI call.
+    
+    Args:
+        user_input (str): The user's input text
+    
+    Returns:
+        tuple: (dict with name and company using 'unknown' for anything not found, confidence between 0 and 1)
+    """
+    text = user_input.strip().rstrip(".!")
+    
+    for pattern, confidence, separator_only in NAME_ORGANIZATION_PATTERNS:
+        match = re.match(pattern, text, re.IGNORECASE)
+        if not match:
+            continue
+        
+        name = match.group("name").strip(" ;:-\"'")
+        company = clean_company(match.group("company"))
+        name_words = name.split()
+        
+        # A name is one to four capitalized words without digits, commas or sentence-like words
+        if not 1 <= len(name_words) <= 4 or "," in name or any(char.isdigit() for char in name):
+            continue
+        if any(word.lower() in NOT_NAME_WORDS for word in name_words):
+            continue
+        if any(not word[0].isupper() and word not in NAME_PARTICLES for word in name_words):
+            continue
+        company_words = company.split()
+        if not company or len(company_words) > 8:
+            continue
+        if company_words[0].lower() in NOT_COMPANY_START_WORDS:
+            continue
+        if any(word.strip(".,").lower() in JOB_TITLE_WORDS for word in company_words):
+            continue
+        
+        if separator_only:
+            # Nothing but the punctuation says which part is which
+            if not (len(name_words) > 1 and company[0].isupper()):
+                confidence = SEPARATOR_ONLY_CONFIDENCE
+        elif len(name_words) == 1:
+            confidence -= 0.05
+        
+        return {"name": name, "company": company}, confidence
+    
+    return {"name": "unknown", "company": "unknown"}, 0.0
+
+def clean_company(company):
+    """
+    Cut an organization name down to the organization itself.
+    
+    Args:
+        company (str): Text matched as the organization
+    
+    Returns:
+        str: The text up to the first sentence break, without trailing pleasantries or punctuation
+    """
+    for sentence_break in re.finditer(r"[.!?]\s+(\S+)", company):
+        before = company[:sentence_break.start()]
+        after = sentence_break.group(1).lower()
+        # 'Acme Inc. Power' goes on, 'Acme Inc. We are a utility' does not
+        if before.split()[-1].lower() in COMPANY_ABBREVIATIONS and after not in NOT_COMPANY_START_WORDS:
+            continue
+        company = before
+        break
+    company = re.sub(TRAILING_PLEASANTRY_PATTERN, "", company, flags=re.IGNORECASE)
+    return company.strip(" ,;:-\"'.")
+
+def request_user_info(user_input):
+    """
+    Ask the AI for the user name and company in the first response.
+    
+    Does not touch the session state, so it can run on a worker thread.
+    
+    Args:
+        user_input (str): The user's input text
+    
+    Returns:
+        dict: Dictionary with name and company, using 'unknown' for anything not found
+    """
     # Extract name and company from response to first question
     extract_messages = [
         {"role": "system", "content": "Extract the user name and organization name from this response to the question 'Could you please provide your name and your organization name?'. Even if the response is brief or partial, try to identify name and organization information."},
         {"role": "user", "content": f"User response: {user_input}\nExtract only the name and organization. Format your response exactly as: NAME: [name], ORGANIZATION: [organization]. If you can only extract one of these, still provide it and use 'unknown' for the other."}
     ]
-    extract_response = get_ai_response(extract_messages)
+    # Parse the extraction response
+    name_part = "unknown"
+    company_part = "unknown"
+    
+    try:
+        extract_response = get_ai_response(extract_messages, cache=True, purpose="user_info")
+    except AIServiceError as e:
+        print(f"Could not extract user information: {e}")
+        return {"name": name_part, "company": company_part}
     
     try:
-        # Parse the extraction response
-        name_part = "unknown"
-        company_part = "unknown"
-        
         if "NAME:" in extract_response:
             name_part = extract_response.split("NAME:")[1].split(",")[0].strip()
             name_part = name_part.replace("[", "").replace("]", "")
@@ -40,31 +175,48 @@ def extract_user_info(user_input):
                 company_part = extract_response.split("COMPANY:")[1].strip()
                 
             company_part = company_part.replace("[", "").replace("]", "")
-        
-        # Only update if we found something useful
-        if name_part != "unknown" or company_part != "unknown":
-            st.session_state.user_info = {
-                "name": name_part if name_part != "unknown" else "",
-                "company": company_part if company_part != "unknown" else ""
-            }
-            
-            # Add this information to the AI context to prevent redundant questions
-            context_message = {"role": "system", "content": f"The user's name is {name_part if name_part != 'unknown' else 'not provided yet'} and they work for {company_part if company_part != 'unknown' else 'an organization that has not been mentioned yet'}. If you know the user's name, address them by it. Do not ask for name or organization information again if it has been provided."}
-            st.session_state.chat_history.append(context_message)
-            
-            # If we only got partial info, immediately ask for the rest
-            if name_part == "unknown" or company_part == "unknown":
-                if name_part == "unknown" and company_part != "unknown":
-                    follow_up = {"role": "system", "content": f"The user has mentioned their organization ({company_part}) but not their name. In your next response, thank them for the organization information and ask for their name."}
-                    st.session_state.chat_history.append(follow_up)
-                elif name_part != "unknown" and company_part == "unknown":
-                    follow_up = {"role": "system", "content": f"The user has mentioned their name ({name_part}) but not their organization. In your next response, address them by name and ask for their organization name."}
-                    st.session_state.chat_history.append(follow_up)
-                    
-            return st.session_state.user_info
     except Exception as e:
         print(f"Could not extract user information: {e}")
+    
+    return {"name": name_part, "company": company_part}
+
+def apply_user_info(extracted):
+    """
+    Store extracted user information in the session and add it to the AI context.
+    
+    Args:
+        extracted (dict): Dictionary with name and company, using 'unknown' for anything not found
+    
+    Returns:
+        dict: Dictionary with name and company information
+    """
+    if not extracted:
         return {"name": "", "company": ""}
+    
+    name_part = extracted.get("name", "unknown")
+    company_part = extracted.get("company", "unknown")
+    
+    # Only update if we found something useful
+    if name_part == "unknown" and company_part == "unknown":
+        return {"name": "", "company": ""}
+    
+    st.session_state.user_info = {
+        "name": name_part if name_part != "unknown" else "",
+        "company": company_part if company_part != "unknown" else ""
+    }
+    
+    # Add this information to the AI context to prevent redundant questions
+    set_guidance("user_info", f"The user's name is {name_part if name_part != 'unknown' else 'not provided yet'} and they work for {company_part if company_part != 'unknown' else 'an organization that has not been mentioned yet'}. If you know the user's name, address them by it. Do not ask for name or organization information again if it has been provided.")
+
+    # If we only got partial info, immediately ask for the rest
+    if name_part == "unknown" and company_part != "unknown":
+        set_guidance("user_info_follow_up", f"The user has mentioned their organization ({company_part}) but not their name. In your next response, thank them for the organization information and ask for their name.")
+    elif name_part != "unknown" and company_part == "unknown":
+        set_guidance("user_info_follow_up", f"The user has mentioned their name ({name_part}) but not their organization. In your next response, address them by name and ask for their organization name.")
+    else:
+        clear_guidance("user_info_follow_up")
+
+    return st.session_state.user_info
 
 def multi_answer_detection(user_input, current_question):
     """
@@ -86,7 +238,7 @@ def multi_answer_detection(user_input, current_question):
     ]
     
     try:
-        multi_answer_response = get_ai_response(multi_answer_check)
+        multi_answer_response = get_ai_response(multi_answer_check, cache=True, purpose="multi_answer")
         if "additional_topics" in multi_answer_response:
             import json
             # Try to extract the JSON part
@@ -94,13 +246,10 @@ def multi_answer_detection(user_input, current_question):
             json_str = "{" + json_part + "}"
             additional_topics = json.loads(json_str).get("additional_topics", [])
             
-            # If additional topics were found, add a system message about it
+            # If additional topics were found, add guidance about it
             if additional_topics:
                 topics_str = ", ".join(additional_topics)
-                st.session_state.chat_history.append({
-                    "role": "system", 
-                    "content": f"The user's response also provided information about these additional topics: {topics_str}. Take this into account and avoid asking questions about these topics if the information has already been provided."
-                })
+                set_guidance("additional_topics", f"The user's response also provided information about these additional topics: {topics_str}. Take this into account and avoid asking questions about these topics if the information has already been provided.")
                 
                 # Update the topic coverage based on additional topics
                 for topic in additional_topics:
@@ -108,6 +257,8 @@ def multi_answer_detection(user_input, current_question):
                         st.session_state.topic_areas_covered[topic] = True
                         
             return additional_topics
+    except AIServiceError as e:
+        print(f"Multi-answer detection skipped: {e}")
     except Exception as e:
         # If we hit an error processing multi-answers, just continue normally
         print(f"Error in multi-answer detection: {e}")
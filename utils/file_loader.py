@@ -2,9 +2,78 @@
 ACME Questionnaire Bot - File Loader
 
 Functions for loading questions and instructions from files.
+
+The questionnaire is compiled once per process into an immutable index, so
+the section, hint or position of a scripted question is a lookup rather than
+a keyword scan or a model call. data/questionnaire.json (QUESTIONNAIRE_FILE)
+holds the questions, their sections and follow-up hints. Without it a plain
+data/questions.txt (QUESTIONS_FILE) still works, with its sections taken from
+SECTION_START_INDEX; 'python init_project.py migrate-questions' converts one
+into the other. The built-in questions are used only while neither can be read.
+
+The questionnaire and the prompt are cached for the whole process: every
+session gets the same immutable objects, and a file is reloaded when its
+modification time changes, so they can be updated without a restart.
 """
 import os
+import sys
+import json
+import time
+import threading
+from types import MappingProxyType
+from collections import namedtuple
 import streamlit as st
+from config import (
+    TOPIC_AREAS, SECTION_START_INDEX, QUESTIONNAIRE_FILE, QUESTIONS_FILE, PROMPT_FILE, FILE_RELOAD_CHECK_INTERVAL
+)
+
+# The compiled questionnaire. Per-question fields are tuples in question order;
+# the lookups are read-only mappings.
+QuestionnaireIndex = namedtuple("QuestionnaireIndex", [
+    "questions",          # question texts
+    "ids",                # question ids
+    "sections",           # section key of each question, None before the first section
+    "hints",              # follow-up hint of each question, empty if none
+    "section_titles",     # section key to title, in questionnaire order
+    "section_questions",  # section key to the indexes of its questions
+    "positions",          # normalized question text to index
+    "id_positions"        # question id to index
+])
+
+# Used when the files cannot be read
+FALLBACK_INSTRUCTIONS = "You are an AI assistant helping with a questionnaire about crew management."
+FALLBACK_QUESTIONS = (
+    "Could you please provide your name and your organization name?",
+    "In what situations will crew management be used by your organization?",
+    "How are you currently managing daily crew assignments?",
+    "How do you manage daily resource assignments?",
+    "How are you assigning work to crews or members?"
+)
+
+# Loaded files shared by all sessions: cache key to {'path', 'stamp', 'checked_at', 'value', 'fallback'}.
+# An entry is only ever replaced whole, so readers see the old or the new value, never a mix.
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+def read_instructions(file_path):
+    """
+    Read the AI instructions from a text file.
+    
+    Args:
+        file_path (str): Path to the instructions file
+        
+    Returns:
+        str: The instructions content
+        
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is empty, e.g. while it is being rewritten
+    """
+    with open(file_path, 'r') as file:
+        instructions = file.read()
+    if not instructions.strip():
+        raise ValueError(f"Instructions file is empty: {file_path}")
+    return instructions
 
 def load_instructions(file_path):
     """
@@ -17,55 +86,414 @@ def load_instructions(file_path):
         str: The instructions content
     """
     try:
-        with open(file_path, 'r') as file:
-            return file.read()
+        return read_instructions(file_path)
     except FileNotFoundError:
         st.error(f"Instructions file not found: {file_path}")
         # Provide a minimal fallback instruction
-        return "You are an AI assistant helping with a questionnaire about crew management."
+        return FALLBACK_INSTRUCTIONS
     except Exception as e:
         st.error(f"Error loading instructions: {e}")
         return "Error loading instructions."
 
-def load_questions(file_path):
+def read_questions(file_path):
     """
-    Load questions from a text file.
+    Read questions from a text file, one per line.
     
     Args:
         file_path (str): Path to the questions file
         
+    Returns:
+        list: List of questions
+        
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file has no questions
+    """
+    with open(file_path, 'r') as file:
+        # Read all questions, one per line
+        questions = []
+        for line in file:
+            line = line.strip()
+            if line:
+                # Remove the number and period at the beginning of the line if present
+                # Example format: "1. Question text"
+                parts = line.split('. ', 1)
+                if len(parts) > 1 and parts[0].isdigit():
+                    questions.append(parts[1])
+                else:
+                    questions.append(line)
+    if not questions:
+        raise ValueError(f"Questions file is empty: {file_path}")
+    return questions
+
+def load_questions(file_path):
+    """
+    Load questions from a text file or a structured questionnaire file.
+    
+    Args:
+        file_path (str): Path to the questions file, or a .json questionnaire
+        
     Returns:
         list: List of questions
     """
+    if file_path.endswith(".json"):
+        return list(load_questionnaire(file_path).questions)
+    
     try:
-        with open(file_path, 'r') as file:
-            # Read all questions, one per line
-            questions = []
-            for line in file:
-                line = line.strip()
-                if line:
-                    # Remove the number and period at the beginning of the line if present
-                    # Example format: "1. Question text"
-                    parts = line.split('. ', 1)
-                    if len(parts) > 1 and parts[0].isdigit():
-                        questions.append(parts[1])
-                    else:
-                        questions.append(line)
-            return questions
+        return read_questions(file_path)
     except FileNotFoundError:
         st.error(f"Questions file not found: {file_path}")
         # Provide a minimal set of fallback questions
-        return [
-            "Could you please provide your name and your organization name?",
-            "In what situations will crew management be used by your organization?",
-            "How are you currently managing daily crew assignments?",
-            "How do you manage daily resource assignments?",
-            "How are you assigning work to crews or members?"
-        ]
+        return list(FALLBACK_QUESTIONS)
     except Exception as e:
         st.error(f"Error loading questions: {e}")
         return ["Could you please provide your name and your organization name?"]
 
+def normalize_question(text):
+    """
+    Normalize question text for lookups.
+    
+    Args:
+        text (str): Question text
+        
+    Returns:
+        str: Lowercase text on one line
+    """
+    return " ".join(text.lower().split())
+
+def compile_questionnaire(entries, section_titles):
+    """
+    Compile questionnaire entries into an immutable index.
+    
+    Args:
+        entries (list): One dict per question with 'id', 'text', 'section' and 'follow_up'
+        section_titles (dict): Section key to title, in questionnaire order
+        
+    Returns:
+        QuestionnaireIndex: The compiled questionnaire
+        
+    Raises:
+        ValueError: If the questionnaire is empty, an id is repeated or a section is unknown
+    """
+    if not entries:
+        raise ValueError("The questionnaire has no questions")
+    
+    section_questions = {section: [] for section in section_titles}
+    positions = {}
+    id_positions = {}
+    for index, entry in enumerate(entries):
+        if entry["id"] in id_positions:
+            raise ValueError(f"Question id '{entry['id']}' is used more than once")
+        section = entry.get("section")
+        if section is not None:
+            if section not in section_questions:
+                raise ValueError(f"Question '{entry['id']}' belongs to unknown section '{section}'")
+            section_questions[section].append(index)
+        id_positions[entry["id"]] = index
+        # The first question wins if two have the same text
+        positions.setdefault(normalize_question(entry["text"]), index)
+    
+    return QuestionnaireIndex(
+        questions=tuple(sys.intern(entry["text"]) for entry in entries),
+        ids=tuple(entry["id"] for entry in entries),
+        sections=tuple(entry.get("section") for entry in entries),
+        hints=tuple(entry.get("follow_up") or "" for entry in entries),
+        section_titles=MappingProxyType(dict(section_titles)),
+        section_questions=MappingProxyType({section: tuple(indexes) for section, indexes in section_questions.items()}),
+        positions=MappingProxyType(positions),
+        id_positions=MappingProxyType(id_positions)
+    )
+
+def read_structured_questionnaire(file_path):
+    """
+    Read the entries and sections of a structured questionnaire file.
+    
+    Args:
+        file_path (str): Path to a questionnaire JSON file
+        
+    Returns:
+        tuple: (entries, section_titles) for compile_questionnaire
+    """
+    with open(file_path, 'r') as file:
+        data = json.load(file)
+    
+    section_titles = {section["key"]: section.get("title") or TOPIC_AREAS.get(section["key"], section["key"]) for section in data["sections"]}
+    entries = [
+        {
+            "id": str(question.get("id") or f"q{number}"),
+            "text": question["text"],
+            "section": question.get("section"),
+            "follow_up": question.get("follow_up", "")
+        }
+        for number, question in enumerate(data["questions"], 1)
+    ]
+    return entries, section_titles
+
+def build_plain_questionnaire(questions):
+    """
+    Build questionnaire entries for a plain list of questions, taking the sections from SECTION_START_INDEX.
+    
+    Args:
+        questions (list): The question texts
+        
+    Returns:
+        tuple: (entries, section_titles) for compile_questionnaire
+    """
+    starts = sorted(SECTION_START_INDEX.items(), key=lambda item: item[1])
+    entries = []
+    for index, text in enumerate(questions):
+        section = None
+        for topic, start_index in starts:
+            if index >= start_index:
+                section = topic
+        entries.append({"id": f"q{index + 1}", "text": text, "section": section, "follow_up": ""})
+    return entries, {topic: TOPIC_AREAS[topic] for topic, _ in starts}
+
+def read_plain_questionnaire(file_path):
+    """
+    Read a plain questions file, taking the sections from SECTION_START_INDEX.
+    
+    Args:
+        file_path (str): Path to the questions file
+        
+    Returns:
+        tuple: (entries, section_titles) for compile_questionnaire
+    """
+    return build_plain_questionnaire(read_questions(file_path))
+
+def get_questionnaire_path():
+    """
+    Get the questionnaire file to use.
+    
+    Returns:
+        str: QUESTIONNAIRE_FILE, or QUESTIONS_FILE if only the plain questions file exists
+    """
+    if not os.path.exists(QUESTIONNAIRE_FILE) and os.path.exists(QUESTIONS_FILE):
+        return QUESTIONS_FILE
+    return QUESTIONNAIRE_FILE
+
+def load_questionnaire(file_path=None, fallback=True):
+    """
+    Load and compile a questionnaire.
+    
+    Args:
+        file_path (str): A .json structured questionnaire, or a plain questions file
+            whose sections are taken from SECTION_START_INDEX. Defaults to get_questionnaire_path().
+        fallback (bool): Use the built-in questions if the file cannot be read; otherwise raise
+        
+    Returns:
+        QuestionnaireIndex: The compiled questionnaire
+    """
+    if file_path is None:
+        file_path = get_questionnaire_path()
+    
+    read = read_structured_questionnaire if file_path.endswith(".json") else read_plain_questionnaire
+    try:
+        questionnaire = compile_questionnaire(*read(file_path))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if not fallback:
+            raise
+        print(f"Could not load questionnaire {file_path}, using the {len(FALLBACK_QUESTIONS)} built-in questions: {e}")
+        return compile_questionnaire(*build_plain_questionnaire(FALLBACK_QUESTIONS))
+    
+    print(f"Using questionnaire {file_path}: {len(questionnaire.questions)} questions in {len(questionnaire.section_titles)} sections")
+    if file_path == QUESTIONS_FILE:
+        print(f"{QUESTIONS_FILE} has no ids or follow-up hints; run 'python init_project.py migrate-questions' to convert it to {QUESTIONNAIRE_FILE}")
+    elif file_path == QUESTIONNAIRE_FILE and os.path.exists(QUESTIONS_FILE):
+        print(f"Ignoring {QUESTIONS_FILE}: {QUESTIONNAIRE_FILE} takes its place; delete it to silence this message")
+    return questionnaire
+
+def write_questionnaire(file_path, entries, section_titles):
+    """
+    Write questionnaire entries as a structured questionnaire file.
+    
+    Args:
+        file_path (str): Path of the questionnaire JSON file
+        entries (list): Question entries with id, text, section and follow_up
+        section_titles (dict): Section key to title, in questionnaire order
+    """
+    data = {
+        "sections": [{"key": key, "title": title} for key, title in section_titles.items()],
+        "questions": [
+            {"id": entry["id"], "text": entry["text"], "section": entry["section"], "follow_up": entry["follow_up"]}
+            for entry in entries
+        ]
+    }
+    with open(file_path, 'w') as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+def get_file_stamp(file_path):
+    """
+    Get what identifies the current version of a file.
+    
+    Args:
+        file_path (str): Path to the file
+        
+    Returns:
+        tuple: Modification time in nanoseconds and size, or None if the file does not exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_cached_file(key, file_path, load, fallback):
+    """
+    Get a loaded file from the process-wide cache, reloading it if the file changed.
+    
+    The file is checked at most every FILE_RELOAD_CHECK_INTERVAL seconds. If a
+    reload fails, the previous value is kept. Only when nothing has been
+    loaded yet is the fallback used, and the file is tried again at the next
+    check.
+    
+    Args:
+        key (str): Cache key
+        file_path (str): Path to the file
+        load (callable): Called with file_path to load the value, raises if it cannot
+        fallback (callable): Called with file_path for a value when the first load fails
+        
+    Returns:
+        The cached value
+    """
+    with _file_cache_lock:
+        entry = _file_cache.get(key)
+        now = time.monotonic()
+        if entry and entry["path"] == file_path and now - entry["checked_at"] < FILE_RELOAD_CHECK_INTERVAL:
+            return entry["value"]
+        
+        stamp = get_file_stamp(file_path)
+        if entry and entry["path"] == file_path and entry["stamp"] == stamp and not entry["fallback"]:
+            entry["checked_at"] = now
+            return entry["value"]
+        
+        try:
+            value = load(file_path)
+        except Exception as e:
+            if entry is None:
+                print(f"Could not load {file_path}, using a fallback until it can be: {e}")
+                _file_cache[key] = {"path": file_path, "stamp": stamp, "checked_at": now, "value": fallback(file_path), "fallback": True}
+                return _file_cache[key]["value"]
+            print(f"Could not reload {file_path}, keeping the loaded version: {e}")
+            entry["checked_at"] = now
+            return entry["value"]
+        
+        print(f"{'Reloaded' if entry else 'Loaded'} {file_path}")
+        _file_cache[key] = {"path": file_path, "stamp": stamp, "checked_at": now, "value": value, "fallback": False}
+        return value
+
+def get_questionnaire():
+    """
+    Get the compiled questionnaire, loading it on first use and again when its file changes.
+    
+    Returns:
+        QuestionnaireIndex: The questionnaire shared by all sessions in the process
+    """
+    return get_cached_file(
+        "questionnaire", get_questionnaire_path(),
+        lambda path: load_questionnaire(path, fallback=False),
+        lambda path: load_questionnaire(path)
+    )
+
+def get_instructions():
+    """
+    Get the AI instructions, loading them on first use and again when the prompt file changes.
+    
+    Returns:
+        str: The instructions shared by all sessions in the process
+    """
+    return get_cached_file(
+        "instructions", PROMPT_FILE,
+        lambda file_path: sys.intern(read_instructions(file_path)),
+        lambda file_path: FALLBACK_INSTRUCTIONS
+    )
+
+def get_session_questionnaire():
+    """
+    Get the questionnaire the current session started with.
+    
+    A reload only affects new sessions, so positions in a running session
+    always refer to the questions it is actually asking.
+    
+    Returns:
+        QuestionnaireIndex: The session's questionnaire
+    """
+    if st.session_state.get("questionnaire") is None:
+        # Sessions started before the questionnaire was kept in the session
+        st.session_state.questionnaire = get_questionnaire()
+    return st.session_state.questionnaire
+
+def find_question(text, questionnaire=None):
+    """
+    Find the index of a scripted question from its text.
+    
+    Args:
+        text (str): Question text, compared without case or extra whitespace
+        questionnaire (QuestionnaireIndex): Questionnaire to search, the current one if not given
+        
+    Returns:
+        int: Index of the question, or None if it is not a scripted question
+    """
+    if questionnaire is None:
+        questionnaire = get_questionnaire()
+    return questionnaire.positions.get(normalize_question(text))
+
+def get_section_for_question(question_index, questionnaire=None):
+    """
+    Find the topic area a scripted question belongs to.
+    
+    Args:
+        question_index (int): Index of the question in the questionnaire
+        questionnaire (QuestionnaireIndex): Questionnaire to search, the current one if not given
+        
+    Returns:
+        str: Topic key from TOPIC_AREAS, or None for questions before the first section
+    """
+    if questionnaire is None:
+        questionnaire = get_questionnaire()
+    sections = questionnaire.sections
+    if question_index < 0:
+        return None
+    # Past the end counts as the last section, e.g. once every question is answered
+    return sections[min(question_index, len(sections) - 1)]
+
+def get_section_for_text(text, questionnaire=None):
+    """
+    Find the topic area of a question from its text.
+    
+    Args:
+        text (str): The question, or a message that contains a scripted question
+        questionnaire (QuestionnaireIndex): Questionnaire to search, the current one if not given
+        
+    Returns:
+        str: Topic key, or None if the text is not a scripted question
+    """
+    if questionnaire is None:
+        questionnaire = get_questionnaire()
+    index = find_question(text, questionnaire)
+    if index is None:
+        # A reworded message may still quote the scripted question
+        normalized = normalize_question(text)
+        index = next((position for question, position in questionnaire.positions.items() if question in normalized), None)
+    return questionnaire.sections[index] if index is not None else None
+
+def get_question_hint(question, questionnaire=None):
+    """
+    Get the follow-up hint of a scripted question.
+    
+    Args:
+        question (str): The question text
+        questionnaire (QuestionnaireIndex): Questionnaire to search, the current one if not given
+        
+    Returns:
+        str: The hint, empty if the question has none or is not scripted
+    """
+    if questionnaire is None:
+        questionnaire = get_questionnaire()
+    index = find_question(question, questionnaire)
+    return questionnaire.hints[index] if index is not None else ""
+
 def create_directory_structure():
     """Create the necessary directory structure if it doesn't exist."""
     
@@ -75,8 +503,8 @@ def create_directory_structure():
     # Create directory for exports
     os.makedirs("exports", exist_ok=True)
     
-    # Check if questions.txt exists, if not create it with default questions
-    if not os.path.exists("data/questions.txt"):
+    # Check if a questionnaire exists, if not create one with default questions
+    if not os.path.exists(QUESTIONNAIRE_FILE) and not os.path.exists(QUESTIONS_FILE):
         default_questions = """Could you please provide your name and your organization name?
 In what situations will crew management be used by your organization?
 How frequently will you use crew management?
@@ -101,5 +529,4 @@ What reports are currently printed and distributed?
 How would you like data to be organized or filtered?
 What is the significance of data organization in your operations?"""
         
-        with open("data/questions.txt", "w") as f:
-            f.write(default_questions)
\ No newline at end of file
+        write_questionnaire(QUESTIONNAIRE_FILE, *build_plain_questionnaire(default_questions.split("\n")))
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+ACME Questionnaire Bot - Guidance Slots
+
+Functions for managing the system messages that steer the AI.
+Each kind of guidance occupies one keyed slot that is replaced rather than
+appended, and the slots are only turned into messages when a request is built.
+"""
+import streamlit as st
+from config import TOPIC_AREAS
+
+def set_guidance(key, content):
+    """
+    Set the guidance for a slot, replacing any previous guidance in it.
+    
+    Args:
+        key (str): Slot name, e.g. 'missing_topics'
+        content (str): The system message text
+    """
+    if "guidance" not in st.session_state:
+        st.session_state.guidance = {}
+    st.session_state.guidance[key] = content
+
+def clear_guidance(key):
+    """
+    Remove the guidance from a slot if there is any.
+    
+    Args:
+        key (str): Slot name
+    """
+    st.session_state.get("guidance", {}).pop(key, None)
+
+def get_guidance_messages():
+    """
+    Turn the current guidance slots into system messages.
+    
+    Returns:
+        list: System message dictionaries, in the order the slots were first set
+    """
+    return [{"role": "system", "content": content} for content in st.session_state.get("guidance", {}).values()]
+
+def steer_to_missing_topics():
+    """
+    Point the AI at the sections still missing once three or more are covered.
+    
+    This is the only writer of the 'missing_topics' slot, so its text does not
+    depend on which coverage update ran last. The slot is cleared when every
+    section is covered or fewer than three are.
+    """
+    covered = st.session_state.topic_areas_covered
+    missing_topics = [TOPIC_AREAS[topic] for topic, status in covered.items() if not status]
+    if sum(covered.values()) < 3 or not missing_topics:
+        clear_guidance("missing_topics")
+        return
+    
+    missing_topics_str = ", ".join(missing_topics)
+    set_guidance("missing_topics", f"IMPORTANT: The following sections have not been covered yet: {missing_topics_str}. Focus your next questions specifically on these sections until all are covered.")
+    print(f"Set guidance about missing topics: {missing_topics_str}")
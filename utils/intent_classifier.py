@@ -0,0 +1,239 @@
+"""
+ACME Questionnaire Bot - Local Intent Classifier
+
+Functions for classifying user messages as ANSWER or QUESTION without an LLM call.
+Rules catch the obvious cases and a small hashed-feature logistic model handles
+the rest; anything below the confidence threshold is left to the LLM.
+"""
+import re
+import json
+import math
+import zlib
+import threading
+from config import (
+    INTENT_MODEL_FILE, INTENT_EXAMPLES_FILE, INTENT_CONFIDENCE_THRESHOLD,
+    INTENT_MODEL_MIN_ANSWER_WORDS, INTENT_SHORT_ANSWER_THRESHOLD
+)
+
+# Number of hashed feature buckets used by the model
+HASH_BUCKETS = 512
+
+# Phrases that mark a short message as a request for help or clarification.
+# Verbs like 'explain' only count when they are aimed at the bot, since answers use them too.
+HELP_PATTERNS = [
+    r"\bwhat do you mean\b", r"\bdon'?t understand\b", r"\bnot sure what\b", r"\bconfused\b",
+    r"^help\b", r"\bneed help\b", r"\bwhat are you asking\b", r"\banother way\b",
+    r"\b(?:can|could|would|will) you (?:please )?(?:explain|clarify|rephrase)\b",
+    r"^(?:please )?(?:explain|clarify|rephrase)\b", r"\bplease (?:explain|clarify|rephrase)\b",
+    r"\b(?:explain|clarify|rephrase) (?:that|this|the|your) question\b",
+    r"\b(?:explain|clarify) what you mean\b",
+    r"\bdon'?t get it\b", r"\bsay that again\b", r"\btell me more\b", r"(?<!\bfor )\bexamples?\b",
+    # Answers can describe something as unclear or not followed, so these only count at the end
+    r"\b(?:do not|don'?t|not) follow(?: you| that)?[.!?]*$", r"\b(?:un|not )clear(?: to me)?[.!?]*$"
+]
+
+_model = None
+_model_lock = threading.Lock()
+
+_stats = {"local_answer": 0, "local_question": 0, "escalated": 0}
+_stats_lock = threading.Lock()
+
+def tokenize(text):
+    """Split a message into lowercase word and question-mark tokens."""
+    return re.findall(r"[a-z0-9']+|\?", text.lower())
+
+def extract_features(text):
+    """
+    Turn a message into hashed feature buckets.
+    
+    Args:
+        text (str): The user's message
+        
+    Returns:
+        set: Indices of the active feature buckets
+    """
+    tokens = tokenize(text)
+    words = [token for token in tokens if token != "?"]
+    
+    features = [f"w:{token}" for token in tokens]
+    features += [f"b:{first}_{second}" for first, second in zip(tokens, tokens[1:])]
+    if words:
+        features.append(f"first:{words[0]}")
+    if text.strip().endswith("?"):
+        features.append("ends_with_question_mark")
+    
+    # Coarse message length
+    if len(words) <= 2:
+        features.append("len:tiny")
+    elif len(words) <= 7:
+        features.append("len:short")
+    elif len(words) <= 15:
+        features.append("len:medium")
+    else:
+        features.append("len:long")
+    
+    return {zlib.crc32(feature.encode("utf-8")) % HASH_BUCKETS for feature in features}
+
+def apply_rules(text):
+    """
+    Classify messages whose intent is obvious from their shape.
+    
+    Args:
+        text (str): The user's message
+        
+    Returns:
+        tuple: (label, confidence), or None if no rule applies
+    """
+    stripped = text.strip()
+    if not stripped.strip("?"):
+        return "QUESTION", 1.0
+    
+    word_count = len(stripped.split())
+    lowered = stripped.lower()
+    
+    if word_count <= 12 and any(re.search(pattern, lowered) for pattern in HELP_PATTERNS):
+        return "QUESTION", 0.95
+    if word_count >= 25 and "?" not in stripped:
+        return "ANSWER", 0.95
+    if stripped.endswith("?") and word_count < 25:
+        return "QUESTION", 0.9
+    
+    return None
+
+def load_intent_model():
+    """
+    Load the trained model weights, once per process.
+    
+    Returns:
+        dict: Model with 'bias' and 'weights', or None if the model file is unavailable
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            try:
+                with open(INTENT_MODEL_FILE, 'r') as file:
+                    _model = json.load(file)
+            except Exception as e:
+                print(f"Intent model not available: {e}")
+                _model = {}
+        return _model or None
+
+def predict_answer_probability(text, model):
+    """
+    Estimate the probability that a message is an answer.
+    
+    Args:
+        text (str): The user's message
+        model (dict): Model with 'bias' and 'weights'
+        
+    Returns:
+        float: Probability of ANSWER between 0 and 1
+    """
+    score = model["bias"] + sum(model["weights"][bucket] for bucket in extract_features(text))
+    return 1.0 / (1.0 + math.exp(-score))
+
+def classify_intent_locally(text):
+    """
+    Classify a message as ANSWER or QUESTION if that can be done confidently.
+    
+    The model alone only decides ANSWER for messages of at least
+    INTENT_MODEL_MIN_ANSWER_WORDS words, or for shorter ones above
+    INTENT_SHORT_ANSWER_THRESHOLD: short requests for help look like short
+    answers to it, and taking one for an answer moves past the question.
+    
+    Args:
+        text (str): The user's message
+        
+    Returns:
+        str: 'ANSWER' or 'QUESTION', or None if the LLM should decide
+    """
+    result = apply_rules(text)
+    
+    if result is None:
+        model = load_intent_model()
+        if model:
+            probability = predict_answer_probability(text, model)
+            result = ("ANSWER", probability) if probability >= 0.5 else ("QUESTION", 1.0 - probability)
+            if result[0] == "ANSWER" and len(text.split()) < INTENT_MODEL_MIN_ANSWER_WORDS and probability < INTENT_SHORT_ANSWER_THRESHOLD:
+                result = None
+    
+    if result is not None and result[1] >= INTENT_CONFIDENCE_THRESHOLD:
+        label = result[0]
+        with _stats_lock:
+            _stats["local_answer" if label == "ANSWER" else "local_question"] += 1
+        return label
+    
+    with _stats_lock:
+        _stats["escalated"] += 1
+    return None
+
+def get_intent_stats():
+    """
+    Get counters for how often the local classifier decided without the LLM.
+    
+    Returns:
+        dict: Counts of local ANSWER and QUESTION decisions and of escalations to the LLM
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+def load_intent_examples(file_path):
+    """
+    Load labelled training messages.
+    
+    Args:
+        file_path (str): Path to a file of 'LABEL<TAB>message' lines
+        
+    Returns:
+        list: List of (message, is_answer) tuples
+    """
+    examples = []
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            label, text = line.split("\t", 1)
+            examples.append((text, label == "ANSWER"))
+    return examples
+
+def train_intent_model(examples, epochs=300, learning_rate=0.1, l2=0.01):
+    """
+    Train the logistic model with plain gradient descent.
+    
+    Args:
+        examples (list): List of (message, is_answer) tuples
+        epochs (int): Number of passes over the examples
+        learning_rate (float): Step size
+        l2 (float): Weight decay
+        
+    Returns:
+        dict: Model with 'bias' and 'weights'
+    """
+    weights = [0.0] * HASH_BUCKETS
+    bias = 0.0
+    featurized = [(extract_features(text), 1.0 if is_answer else 0.0) for text, is_answer in examples]
+    
+    for _ in range(epochs):
+        for features, target in featurized:
+            score = bias + sum(weights[bucket] for bucket in features)
+            error = 1.0 / (1.0 + math.exp(-score)) - target
+            bias -= learning_rate * error
+            for bucket in features:
+                weights[bucket] -= learning_rate * (error + l2 * weights[bucket])
+    
+    return {"buckets": HASH_BUCKETS, "bias": round(bias, 6), "weights": [round(weight, 6) for weight in weights]}
+
+if __name__ == "__main__":
+    training_examples = load_intent_examples(INTENT_EXAMPLES_FILE)
+    trained_model = train_intent_model(training_examples)
+    
+    correct = sum(
+        (predict_answer_probability(text, trained_model) >= 0.5) == is_answer
+        for text, is_answer in training_examples
+    )
+    print(f"Trained on {len(training_examples)} examples, training accuracy {correct / len(training_examples):.0%}")
+    
+    with open(INTENT_MODEL_FILE, 'w') as f:
+        json.dump(trained_model, f)
+    print(f"Wrote {INTENT_MODEL_FILE}")
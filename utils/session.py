@@ -7,9 +7,25 @@ import os
 import json
 import streamlit as st
 from datetime import datetime
-from services.ai_service import get_ai_response
-from utils.file_loader import load_questions, load_instructions
-from config import QUESTIONS_FILE, PROMPT_FILE, TOPIC_AREAS
+from services.ai_service import get_ai_response, stream_ai_response, get_structured_response
+from services.resilience import AIServiceError, AIRateLimitError, AIUnavailableError
+from services.turn_pipeline import submit_call, join_calls
+from utils.file_loader import get_questionnaire, get_instructions
+from utils.context_window import get_context_messages
+from utils.guidance import steer_to_missing_topics
+from services.assist_service import prefetch_assists, preload_assists
+from utils.topic_coverage import (
+    initialize_coverage_state, update_topic_coverage, schedule_coverage_check, plan_coverage_check,
+    request_coverage, apply_coverage, record_scripted_answer
+)
+from config import (
+    TOPIC_AREAS, OPENAI_STREAM_RESPONSES, UNIFIED_TURN_MODE,
+    USER_INFO_CONFIDENCE_THRESHOLD, HEDGE_CONVERSATION
+)
+
+# Shown in place of a reply when the AI call fails
+REPLY_FAILED_MESSAGE = "Sorry, I couldn't get a response just now. Please send your message again."
+REPLY_BUSY_MESSAGE = "The assistant is very busy right now. Please wait a moment and send your message again."
 
 def initialize_session_state():
     """Initialize the session state if it hasn't been initialized yet."""
@@ -19,9 +35,15 @@ def initialize_session_state():
         st.session_state.chat_history = []
         st.session_state.visible_messages = []
         st.session_state.current_question_index = 0
-        st.session_state.questions = load_questions(QUESTIONS_FILE)
+        # Shared with every other session, never modified. The session keeps the
+        # questionnaire it started with even if the file is reloaded.
+        st.session_state.questionnaire = get_questionnaire()
+        st.session_state.questions = st.session_state.questionnaire.questions
         st.session_state.current_question = st.session_state.questions[0]
-        st.session_state.instructions = load_instructions(PROMPT_FILE)
+        st.session_state.instructions = get_instructions()
+        
+        # Make sure the prebuilt help and example content is loaded for this process
+        preload_assists()
         st.session_state.chat_history = [{"role": "system", "content": st.session_state.instructions}]
         st.session_state.user_info = {"name": "", "company": ""}
         st.session_state.consecutive_empty_responses = 0
@@ -35,6 +57,7 @@ def initialize_session_state():
             'current_practices': False
         }
         st.session_state.total_topics = len(st.session_state.topic_areas_covered)
+        initialize_coverage_state()
         st.session_state.summary_requested = False
         st.session_state.previous_summary_request = False
         
@@ -46,6 +69,10 @@ def initialize_session_state():
         st.session_state.chat_history.append({"role": "assistant", "content": welcome_message})
         st.session_state.visible_messages.append({"role": "assistant", "content": welcome_message})
         
+        st.session_state.pending_response = None
+        st.session_state.background_work = []
+        st.session_state.summary_request_due = None
+        st.session_state.guidance = {}
         st.session_state.initialized = True
         st.session_state.email_sent = False
 
@@ -69,7 +96,8 @@ def export_session_data():
         "current_question_index": st.session_state.current_question_index,
         "chat_history": safe_chat_history,
         "visible_messages": safe_visible_messages,
-        "topic_areas_covered": dict(st.session_state.topic_areas_covered)
+        "topic_areas_covered": dict(st.session_state.topic_areas_covered),
+        "guidance": dict(st.session_state.get("guidance", {}))
     }
     
     # Add debugging mechanism
@@ -102,6 +130,9 @@ def import_session_data(data):
         # Mark that we're restoring a session
         st.session_state.restoring_session = True
         
+        # Results still coming for the replaced session must not touch the restored one
+        discard_background_work()
+        
         # Restore session state from imported data
         st.session_state.user_info = data.get("user_info", {})
         st.session_state.responses = data.get("responses", [])
@@ -110,6 +141,10 @@ def import_session_data(data):
         # Ensure chat history has system prompt
         if "chat_history" in data and len(data["chat_history"]) > 0:
             st.session_state.chat_history = data.get("chat_history", [])
+            # Share the loaded prompt instead of keeping the saved copy of it
+            first_message = st.session_state.chat_history[0]
+            if first_message.get("role") == "system" and first_message.get("content") == st.session_state.instructions:
+                first_message["content"] = st.session_state.instructions
         else:
             # If no chat history, initialize with system prompt
             st.session_state.chat_history = [{"role": "system", "content": st.session_state.instructions}]
@@ -122,6 +157,11 @@ def import_session_data(data):
                 if topic in st.session_state.topic_areas_covered:
                     st.session_state.topic_areas_covered[topic] = status
         
+        # Restore the steering messages; files saved without them start with none
+        st.session_state.guidance = {
+            str(key): str(content) for key, content in (data.get("guidance") or {}).items()
+        }
+        
         # Set current question
         if st.session_state.current_question_index < len(st.session_state.questions):
             st.session_state.current_question = st.session_state.questions[st.session_state.current_question_index]
@@ -138,10 +178,11 @@ def import_session_data(data):
 
 def process_user_input(user_input, cookies=None):
     """Process user input and update the session state accordingly."""
-    from utils.special_messages import process_special_messages
-    from utils.extract import extract_user_info
     from ui.components import display_completion_summary
 
+    # Results of the previous turn must be in place before this message is handled
+    apply_background_results(wait=True)
+
     # Check if input is empty or just whitespace
     if not user_input or user_input.isspace():
         st.error("Please enter a message before sending.")
@@ -162,26 +203,26 @@ def process_user_input(user_input, cookies=None):
         st.session_state.chat_history.append({"role": "user", "content": user_input})
         st.session_state.visible_messages.append({"role": "user", "content": user_input})
         
-        # For the first question, extract user and company name
-        if st.session_state.current_question_index == 0:
-            extract_user_info(user_input)
+        # Start the calls that don't depend on the reply so they run alongside it
+        aux_calls = start_auxiliary_calls(user_input, classify=not UNIFIED_TURN_MODE)
         
-        # Get AI response
-        ai_response = get_ai_response(st.session_state.chat_history)
-        
-        # Check if this is a special message
-        is_special = process_special_messages(ai_response)
-        
-        # Add the response to visible messages if not special
-        if not is_special:
-            st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
-            st.session_state.visible_messages.append({"role": "assistant", "content": ai_response})
-            
-            # Force a topic update check after each response
-            check_topic_coverage()
-            
-        # Check if this is an answer to the current question
-        handle_question_advancement(user_input)
+        if UNIFIED_TURN_MODE:
+            # One structured call replaces the reply, topic check and advancement check
+            complete_unified_turn(user_input, aux_calls)
+        elif OPENAI_STREAM_RESPONSES:
+            # Let the next run stream the reply into the chat as it is generated
+            st.session_state.pending_response = {"user_input": user_input, "aux_calls": aux_calls}
+        else:
+            # Get AI response
+            try:
+                ai_response = get_conversation_response()
+            except AIServiceError as e:
+                handle_reply_failure(e, aux_calls)
+            else:
+                complete_regular_turn(user_input, ai_response, aux_calls)
+    
+    # A summary request found in the previous turn's results is handled after the new message
+    handle_due_summary_request()
     
     # Display completion summary if requested
     if st.session_state.get("summary_requested", False):
@@ -190,41 +231,293 @@ def process_user_input(user_input, cookies=None):
     # Rerun the app to update the UI
     st.rerun()
 
-def handle_example_request(user_input):
-    """Handle an example request from the user."""
-    from services.ai_service import get_ai_response
-    
-    # Find the last question asked by the assistant
-    last_question = None
-    for msg in reversed(st.session_state.visible_messages):
-        if msg["role"] == "assistant":
-            # Extract the last question from the assistant's message
-            last_question = msg["content"]
-            break
-    
-    # Create message context
-    example_messages = st.session_state.chat_history.copy()
-    
-    # Add a system message that ensures the example is for the CURRENT question
-    example_messages.append({
-        "role": "system", 
-        "content": f"""
-        Provide an example answer for the LAST question you asked. The example MUST be directly relevant to what you just asked the user.
+def stream_conversation_response():
+    """
+    Stream the AI's reply to the conversation so far, hedged if HEDGE_CONVERSATION is on.
+    
+    Returns:
+        generator: Pieces of the reply text
+    """
+    if HEDGE_CONVERSATION:
+        from services.hedging import stream_hedged_response
+        return stream_hedged_response(get_context_messages())
+    return stream_ai_response(get_context_messages())
+
+def get_conversation_response():
+    """
+    Get the AI's full reply to the conversation so far, hedged if HEDGE_CONVERSATION is on.
+    
+    Returns:
+        str: The reply text
         
-        Format your response EXACTLY as follows, including the spacing:
+    Raises:
+        AIServiceError: If the call failed
+    """
+    if HEDGE_CONVERSATION:
+        return "".join(stream_conversation_response()).strip()
+    return get_ai_response(get_context_messages())
+
+def start_auxiliary_calls(user_input, classify=True):
+    """
+    Start the LLM calls of a regular turn that don't depend on the AI's reply.
+    
+    Args:
+        user_input (str): The user's message
+        classify (bool): Whether to start the ANSWER/QUESTION classification
+        
+    Returns:
+        dict: Mapping of call name to Future
+    """
+    from utils.extract import extract_user_info_locally, request_user_info, apply_user_info
+    
+    aux_calls = {}
+    
+    # Check if this is an answer to the current question
+    if classify and st.session_state.current_question_index < len(st.session_state.questions):
+        aux_calls["advancement"] = submit_call(classify_user_message, st.session_state.current_question, user_input)
+    
+    # For the first question, extract user and company name.
+    # Clear-cut answers are parsed locally so the reply can already use them.
+    if st.session_state.current_question_index == 0:
+        extracted, confidence = extract_user_info_locally(user_input)
+        if confidence >= USER_INFO_CONFIDENCE_THRESHOLD:
+            apply_user_info(extracted)
+        else:
+            aux_calls["user_info"] = submit_call(request_user_info, user_input)
+    
+    return aux_calls
+
+def complete_regular_turn(user_input, ai_response, aux_calls):
+    """
+    Apply the AI's reply for a regular user message.
+    
+    The reply is shown straight away. The auxiliary results and the topic
+    coverage check are applied on a later run, see apply_background_results.
+    
+    Args:
+        user_input (str): The user's message
+        ai_response (str): The AI's full reply to the message
+        aux_calls (dict): Mapping of call name to Future, from start_auxiliary_calls
+    """
+    from utils.special_messages import process_special_messages
+    
+    # Check if this is a special message
+    is_special = process_special_messages(ai_response)
+    
+    # Add the response to visible messages if not special
+    if not is_special:
+        st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+        st.session_state.visible_messages.append({"role": "assistant", "content": ai_response})
+    
+    # User details and the answer check, then the coverage, in the order the old flow applied them
+    queue_background_result("auxiliary", aux_calls, user_input=user_input)
+    if not is_special:
+        # Check the topic coverage when the scheduler finds it worthwhile
+        check_topic_coverage(user_input, background=True)
+
+def queue_background_result(kind, calls, **details):
+    """
+    Remember background calls whose results are applied on a later run.
+    
+    Args:
+        kind (str): 'auxiliary' for the calls from start_auxiliary_calls, 'coverage' for a coverage check
+        calls (dict): Mapping of call name to Future
+        **details: What applying the results needs to know about the turn
+    """
+    if "background_work" not in st.session_state:
+        st.session_state.background_work = []
+    st.session_state.background_work.append(dict(details, kind=kind, calls=calls))
+
+def apply_background_results(wait=False):
+    """
+    Apply the results of background calls in the order they were started.
+    
+    Stops at the first entry that is still running, so a later result is never
+    applied before an earlier one. Never reruns the app: a summary request
+    found here is only noted, and the caller runs handle_due_summary_request
+    once it has handled its own input.
+    
+    Args:
+        wait (bool): Wait for every entry instead of stopping at unfinished ones
         
-        *Example: "[your example here]"*
+    Returns:
+        bool: True if any result was applied
+    """
+    from utils.extract import apply_user_info
+    
+    work = st.session_state.get("background_work", [])
+    applied = False
+    while work and (wait or all(future.done() for future in work[0]["calls"].values())):
+        entry = work.pop(0)
+        results = join_calls(entry["calls"])
+        applied = True
         
-        [BLANK LINE]
+        if entry["kind"] == "coverage":
+            apply_coverage(entry["mode"], results["coverage"], entry["exchanges"])
+            steer_to_missing_topics()
+            continue
         
-        To continue with our question, [restate the original question in full]
+        if "user_info" in results:
+            apply_user_info(results["user_info"])
         
-        Note: There must be a completely blank line between the example and the question to create visual separation.
+        # Check if this is an answer to the current question
+        if results.get("advancement"):
+            handle_question_advancement(entry["user_input"], results["advancement"], defer_summary=True)
+    
+    return applied
+
+def discard_background_work():
+    """Drop the pending reply and all queued background results, cancelling calls that have not started."""
+    for entry in st.session_state.get("background_work", []):
+        for future in entry["calls"].values():
+            future.cancel()
+    pending = st.session_state.get("pending_response")
+    if pending:
+        for future in pending["aux_calls"].values():
+            future.cancel()
+    
+    st.session_state.background_work = []
+    st.session_state.pending_response = None
+    st.session_state.summary_request_due = None
+
+def handle_due_summary_request():
+    """
+    Handle a summary request deferred by apply_background_results.
+    
+    Returns:
+        bool: True if there was one
+    """
+    user_input = st.session_state.get("summary_request_due")
+    if not user_input:
+        return False
+    
+    # The user's message is already in the chat from its own turn
+    handle_summary_request(user_input, add_user_message=False)
+    return True
+
+def complete_unified_turn(user_input, aux_calls):
+    """
+    Handle a regular user message with a single structured AI call.
+    
+    Falls back to the separate reply, topic and advancement calls if the
+    structured result is missing or does not match the schema.
+    
+    Args:
+        user_input (str): The user's message
+        aux_calls (dict): Mapping of call name to Future, from start_auxiliary_calls
+    """
+    from utils.special_messages import TURN_RESULT_SCHEMA, validate_turn_result, process_turn_result
+    from utils.extract import apply_user_info
+    
+    turn_messages = get_context_messages(tail=[{
+        "role": "system",
+        "content": f"""
+        Respond with a JSON object instead of plain text.
+        - assistant_message: your reply to the user, following all previous instructions.
+        - topic_coverage: the status of ALL topic areas based on the whole conversation so far.
+        - answered_current_question: true if the user's latest message is a direct answer to the question "{st.session_state.current_question}", false if it is a request for help or clarification.
+        - summary_requested: true only where you would otherwise send SUMMARY_REQUEST.
+        Do not write TOPIC_UPDATE or SUMMARY_REQUEST messages; use these fields instead.
         """
+    }])
+    
+    try:
+        result = get_structured_response(turn_messages, "questionnaire_turn", TURN_RESULT_SCHEMA)
+    except AIServiceError as e:
+        handle_reply_failure(e, aux_calls)
+        return
+    
+    if not validate_turn_result(result):
+        print(f"Invalid unified turn result, falling back to separate calls: {result}")
+        if st.session_state.current_question_index < len(st.session_state.questions):
+            aux_calls["advancement"] = submit_call(classify_user_message, st.session_state.current_question, user_input)
+        try:
+            ai_response = get_conversation_response()
+        except AIServiceError as e:
+            handle_reply_failure(e, aux_calls)
+            return
+        complete_regular_turn(user_input, ai_response, aux_calls)
+        return
+    
+    aux_results = join_calls(aux_calls)
+    if "user_info" in aux_results:
+        apply_user_info(aux_results["user_info"])
+    
+    assistant_message, answered = process_turn_result(result)
+    
+    if assistant_message:
+        st.session_state.chat_history.append({"role": "assistant", "content": assistant_message})
+        st.session_state.visible_messages.append({"role": "assistant", "content": assistant_message})
+    
+    handle_question_advancement(user_input, "ANSWER" if answered else "QUESTION")
+
+def complete_pending_response(render):
+    """
+    Stream the AI's reply to the pending user message and finish the turn.
+    
+    Args:
+        render (callable): Called with the text received so far each time the stream advances
+    """
+    from utils.special_messages import filter_special_stream
+    from ui.components import display_completion_summary
+    
+    pending = st.session_state.get("pending_response")
+    if not pending:
+        return
+    
+    # Clear the pending turn first so an interrupted run never streams it twice
+    st.session_state.pending_response = None
+    
+    collected = []
+    displayed = ""
+    try:
+        for piece in filter_special_stream(stream_conversation_response(), collected):
+            displayed += piece
+            render(displayed)
+    except AIServiceError as e:
+        # Partial text is discarded; the user sends the message again
+        handle_reply_failure(e, pending["aux_calls"])
+    else:
+        complete_regular_turn(pending["user_input"], "".join(collected).strip(), pending["aux_calls"])
+    
+    # Display completion summary if requested
+    if st.session_state.get("summary_requested", False):
+        display_completion_summary()
+    
+    st.rerun()
+
+def handle_reply_failure(error, aux_calls):
+    """
+    Tell the user their message got no reply and drop the rest of the turn.
+    
+    The user's message is taken out of the AI context so sending it again does
+    not repeat it, and the auxiliary results are ignored so a failed turn never
+    advances the questionnaire.
+    
+    Args:
+        error (AIServiceError): Why the reply failed
+        aux_calls (dict): Mapping of call name to Future, from start_auxiliary_calls
+    """
+    print(f"Reply failed: {error}")
+    
+    for future in aux_calls.values():
+        future.cancel()
+    
+    if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "user":
+        st.session_state.chat_history.pop()
+    
+    busy = isinstance(error, (AIRateLimitError, AIUnavailableError))
+    st.session_state.visible_messages.append({
+        "role": "assistant",
+        "content": REPLY_BUSY_MESSAGE if busy else REPLY_FAILED_MESSAGE
     })
+
+def handle_example_request(user_input):
+    """Handle an example request from the user."""
+    from services.assist_service import get_assist
     
     # Get the example response
-    example_response = get_ai_response(example_messages)
+    example_response = get_assist("example")
     
     # Add to chat history
     st.session_state.chat_history.append({"role": "user", "content": user_input})
@@ -234,8 +527,17 @@ def handle_example_request(user_input):
         {"role": "assistant", "content": example_response}
     ])
 
-def handle_summary_request(user_input):
-    """Handle a summary request from the user."""
+def handle_summary_request(user_input, add_user_message=True):
+    """
+    Handle a summary request from the user.
+    
+    Args:
+        user_input (str): The user's message
+        add_user_message (bool): Add the message to the chat, False if it is already there
+    """
+    # This request supersedes any deferred one
+    st.session_state.summary_request_due = None
+    
     # If user is frustrated or explicitly requesting summary multiple times, override strict checks
     force_summary = any(phrase in user_input.lower() for phrase in ["already answered", "not helpful", "i already responded", "already responded"]) or st.session_state.get("previous_summary_request", False)
     
@@ -243,8 +545,9 @@ def handle_summary_request(user_input):
     st.session_state["previous_summary_request"] = True
     
     # Add user message to chat history
-    st.session_state.chat_history.append({"role": "user", "content": user_input})
-    st.session_state.visible_messages.append({"role": "user", "content": user_input})
+    if add_user_message:
+        st.session_state.chat_history.append({"role": "user", "content": user_input})
+        st.session_state.visible_messages.append({"role": "user", "content": user_input})
     
     # Force summary if user is requesting it again or showing frustration
     if force_summary:
@@ -259,6 +562,9 @@ def handle_summary_request(user_input):
         st.session_state.chat_history.append({"role": "assistant", "content": summary_confirm})
         st.session_state.visible_messages.append({"role": "assistant", "content": summary_confirm})
     else:
+        # Bring the coverage up to date, since checks are skipped on most turns
+        check_topic_coverage(user_input, force=True)
+        
         # Check if all topics are covered
         all_topics_covered = all(st.session_state.topic_areas_covered.values())
         
@@ -276,52 +582,91 @@ def handle_summary_request(user_input):
             st.session_state.chat_history.append({"role": "assistant", "content": missing_response})
             st.session_state.visible_messages.append({"role": "assistant", "content": missing_response})
 
-def handle_question_advancement(user_input):
-    """Check if the user input should advance to the next question."""
-    from services.ai_service import get_ai_response
+def classify_user_message(question, user_input):
+    """
+    Decide whether a user message answers the question or asks for help.
     
+    Does not touch the session state, so it can run on a worker thread.
+    
+    Args:
+        question (str): The question the user is responding to
+        user_input (str): The user's message
+        
+    Returns:
+        str: The classification, expected to be 'ANSWER' or 'QUESTION', or None if the AI call failed
+    """
+    from utils.intent_classifier import classify_intent_locally
+    
+    # Obvious answers and questions are decided locally without a network call
+    local_label = classify_intent_locally(user_input)
+    if local_label:
+        return local_label
+    
+    messages_for_check = [
+        {"role": "system", "content": "You are helping to determine if a user message is an answer to a question or a request for help/clarification."},
+        {"role": "user", "content": f"Question: {question}\nUser message: {user_input}\nIs this a direct answer to the question or a request for help/clarification? Reply with exactly 'ANSWER' or 'QUESTION'."}
+    ]
+    try:
+        return get_ai_response(messages_for_check, cache=True, purpose="advancement")
+    except AIServiceError as e:
+        # Without a decision the question is not advanced
+        print(f"Could not classify user message: {e}")
+        return None
+
+def handle_question_advancement(user_input, response_type=None, defer_summary=False):
+    """
+    Check if the user input should advance to the next question.
+    
+    Args:
+        user_input (str): The user's message
+        response_type (str): Classification from classify_user_message, fetched if not given
+        defer_summary (bool): Only note a summary request for handle_due_summary_request
+            instead of handling it now
+    """
     if st.session_state.current_question_index < len(st.session_state.questions):
-        messages_for_check = [
-            {"role": "system", "content": "You are helping to determine if a user message is an answer to a question or a request for help/clarification."},
-            {"role": "user", "content": f"Question: {st.session_state.current_question}\nUser message: {user_input}\nIs this a direct answer to the question or a request for help/clarification? Reply with exactly 'ANSWER' or 'QUESTION'."}
-        ]
-        response_type = get_ai_response(messages_for_check)
+        if response_type is None:
+            response_type = classify_user_message(st.session_state.current_question, user_input)
+            if response_type is None:
+                return
         
         if "ANSWER" in response_type.upper():
             # Special handling for "Yes" responses to summary questions
             if "summary" in st.session_state.current_question.lower() and user_input.lower().strip() in ["yes", "yeah", "sure", "ok", "okay"]:
                 # Treat as a summary request
-                handle_summary_request(user_input)
+                if defer_summary:
+                    st.session_state.summary_request_due = user_input
+                else:
+                    handle_summary_request(user_input)
             else:
                 # Store answer and advance to next question
                 st.session_state.responses.append((st.session_state.current_question, user_input))
+                record_scripted_answer(st.session_state.current_question_index)
                 st.session_state.current_question_index += 1
                 if st.session_state.current_question_index < len(st.session_state.questions):
                     st.session_state.current_question = st.session_state.questions[st.session_state.current_question_index]
+                    
+                    # Speculatively prepare help and example content for the new question
+                    prefetch_assists()
 
-def check_topic_coverage():
-    """Check which topics have been covered and update system prompts."""
-    from services.ai_service import get_ai_response
-    
-    # Force a topic update message after each regular response
-    topic_check_messages = st.session_state.chat_history.copy()
-    topic_check_messages.append({
-        "role": "system", 
-        "content": "Based on all conversation so far, which sections have been covered? Respond ONLY with a TOPIC_UPDATE message that includes the status of ALL topic areas."
-    })
+def check_topic_coverage(user_input, force=False, background=False):
+    """
+    Check which topics have been covered and update system prompts.
     
-    topic_update_response = get_ai_response(topic_check_messages)
-    from utils.special_messages import process_special_messages
-    process_special_messages(topic_update_response)
+    Args:
+        user_input (str): The user's latest message
+        force (bool): Run the check even if the scheduler would skip it
+        background (bool): Run the check on the worker pool and apply it on a later run
+    """
+    if not force and not schedule_coverage_check(user_input):
+        return
     
-    # Check if we're at 3+ sections and force a check for missing sections
-    covered_count = sum(st.session_state.topic_areas_covered.values())
-    if covered_count >= 3:
-        missing_topics = [TOPIC_AREAS[t] for t, v in st.session_state.topic_areas_covered.items() if not v]
-        if missing_topics:
-            missing_topics_str = ", ".join(missing_topics)
-            focus_message = {
-                "role": "system", 
-                "content": f"IMPORTANT: Focus on gathering information about these remaining sections in your next questions: {missing_topics_str}"
-            }
-            st.session_state.chat_history.append(focus_message)
\ No newline at end of file
+    # Only the exchanges since the previous check are sent, with a full check every few checks
+    if background:
+        plan = plan_coverage_check()
+        if plan is not None:
+            mode, messages, exchanges = plan
+            queue_background_result("coverage", {"coverage": submit_call(request_coverage, mode, messages)}, mode=mode, exchanges=exchanges)
+        return
+    
+    update_topic_coverage()
+    steer_to_missing_topics()
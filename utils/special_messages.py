@@ -6,6 +6,28 @@ Functions for processing special messages from the AI.
 import json
 import streamlit as st
 from config import TOPIC_AREAS
+from utils.guidance import set_guidance, clear_guidance, steer_to_missing_topics
+
+# Markers that identify a special (non-displayed) message from the AI
+SPECIAL_MESSAGE_MARKERS = ("TOPIC_UPDATE:", "SUMMARY_REQUEST", "summary_requested = True")
+
+# JSON schema for a unified turn: the reply plus everything the auxiliary checks used to provide
+TURN_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "assistant_message": {"type": "string"},
+        "topic_coverage": {
+            "type": "object",
+            "properties": {topic: {"type": "boolean"} for topic in TOPIC_AREAS},
+            "required": list(TOPIC_AREAS),
+            "additionalProperties": False
+        },
+        "answered_current_question": {"type": "boolean"},
+        "summary_requested": {"type": "boolean"}
+    },
+    "required": ["assistant_message", "topic_coverage", "answered_current_question", "summary_requested"],
+    "additionalProperties": False
+}
 
 def process_special_messages(message_content):
     """
@@ -31,29 +53,8 @@ def process_special_messages(message_content):
             print(f"Extracted JSON string: {json_str}")
             
             topic_updates = json.loads(json_str)
+            apply_topic_updates(topic_updates)
             
-            # Update the session state
-            for topic, status in topic_updates.items():
-                if topic in st.session_state.topic_areas_covered:
-                    st.session_state.topic_areas_covered[topic] = status
-                    print(f"Updated topic {topic} to {status}")
-            
-            # Check for near completion and proactively ask about missing topics
-            covered_count = sum(st.session_state.topic_areas_covered.values())
-            total_topics = len(st.session_state.topic_areas_covered)
-            
-            # If we're near completion (3+ sections covered), check for missing topics
-            if covered_count >= 3:
-                missing_topics = [t for t, v in st.session_state.topic_areas_covered.items() if not v]
-                if missing_topics:
-                    # Add system message to explicitly ask about missing topics
-                    missing_topics_str = ", ".join([TOPIC_AREAS[t] for t in missing_topics])
-                    st.session_state.chat_history.append({
-                        "role": "system",
-                        "content": f"IMPORTANT: The following sections have not been covered yet: {missing_topics_str}. Focus your next questions specifically on these sections until all are covered."
-                    })
-                    print(f"Added system message about missing topics: {missing_topics_str}")
-                    
             processed = True
         except Exception as e:
             print(f"Error processing topic update: {e}")
@@ -63,26 +64,136 @@ def process_special_messages(message_content):
     # Check for summary request
     if "SUMMARY_REQUEST" in message_content or "summary_requested = True" in message_content:
         print("Summary request detected!")
-        
-        # Only set summary_requested if ALL topics are covered
-        all_topics_covered = all(st.session_state.topic_areas_covered.values())
-        if all_topics_covered:
-            # All sections covered, allow summary
-            st.session_state.summary_requested = True
-        else:
-            # Add a system message to focus on missing topics
-            missing_topics = [t for t, v in st.session_state.topic_areas_covered.items() if not v]
-            missing_topics_str = ", ".join([TOPIC_AREAS[t] for t in missing_topics])
-            st.session_state.chat_history.append({
-                "role": "system",
-                "content": f"The user has requested a summary, but the following sections have not been covered: {missing_topics_str}. Please inform the user that these sections need to be addressed before completing the questionnaire, and ask specifically about these sections."
-            })
-        
+        apply_summary_request()
         processed = True
     
     # Return whether the message was processed
     return processed
 
+def apply_topic_updates(topic_updates):
+    """
+    Update topic coverage and steer the AI towards missing topics when near completion.
+    
+    Args:
+        topic_updates (dict): Mapping of topic key to covered status
+    """
+    # Update the session state
+    for topic, status in topic_updates.items():
+        if topic in st.session_state.topic_areas_covered:
+            st.session_state.topic_areas_covered[topic] = status
+            print(f"Updated topic {topic} to {status}")
+    
+    # Near completion (3+ sections covered), proactively ask about missing topics
+    steer_to_missing_topics()
+    
+    # A blocked summary request only names the sections that are still missing
+    if "summary_blocked" in st.session_state.get("guidance", {}):
+        set_summary_blocked_guidance()
+
+def set_summary_blocked_guidance():
+    """Tell the AI which sections are missing after a summary request, or clear that once none are."""
+    missing_topics = [t for t, v in st.session_state.topic_areas_covered.items() if not v]
+    if not missing_topics:
+        clear_guidance("summary_blocked")
+        return
+    missing_topics_str = ", ".join([TOPIC_AREAS[t] for t in missing_topics])
+    set_guidance("summary_blocked", f"The user has requested a summary, but the following sections have not been covered: {missing_topics_str}. Please inform the user that these sections need to be addressed before completing the questionnaire, and ask specifically about these sections.")
+
+def apply_summary_request():
+    """Allow the summary if all topics are covered, otherwise steer the AI towards the missing ones."""
+    # Only set summary_requested if ALL topics are covered
+    all_topics_covered = all(st.session_state.topic_areas_covered.values())
+    if all_topics_covered:
+        # All sections covered, allow summary
+        st.session_state.summary_requested = True
+        clear_guidance("summary_blocked")
+    else:
+        # Add guidance to focus on missing topics
+        set_summary_blocked_guidance()
+
+def validate_turn_result(result):
+    """
+    Check that a unified turn result matches TURN_RESULT_SCHEMA.
+    
+    Args:
+        result: The decoded JSON returned by the AI
+        
+    Returns:
+        bool: True if the result has every field with the right type, False otherwise
+    """
+    if not isinstance(result, dict) or set(result) != set(TURN_RESULT_SCHEMA["required"]):
+        return False
+    if not isinstance(result["assistant_message"], str):
+        return False
+    if not isinstance(result["answered_current_question"], bool) or not isinstance(result["summary_requested"], bool):
+        return False
+    coverage = result["topic_coverage"]
+    if not isinstance(coverage, dict) or set(coverage) != set(TOPIC_AREAS):
+        return False
+    return all(isinstance(status, bool) for status in coverage.values())
+
+def process_turn_result(result):
+    """
+    Apply a unified turn result in place of separate reply, topic and advancement checks.
+    
+    Args:
+        result (dict): A result that passed validate_turn_result
+        
+    Returns:
+        tuple: (assistant message to display, whether the user answered the current question)
+    """
+    apply_topic_updates(result["topic_coverage"])
+    
+    if result["summary_requested"]:
+        print("Summary request detected!")
+        apply_summary_request()
+    
+    return result["assistant_message"].strip(), result["answered_current_question"]
+
+def filter_special_stream(chunks, collected):
+    """
+    Pass through streamed response text, suppressing it once a special message is detected.
+
+    Text that could be the beginning of a special message marker is held back until
+    enough has arrived to tell, so markers never flash up in the chat.
+
+    Args:
+        chunks (iterable): Pieces of the streamed response text
+        collected (list): List that receives every raw piece, for processing once the stream ends
+
+    Yields:
+        str: Pieces of text that are safe to display
+    """
+    full_text = ""
+    emitted = 0
+    suppressed = False
+
+    for chunk in chunks:
+        collected.append(chunk)
+        if suppressed:
+            continue
+
+        full_text += chunk
+        if any(marker in full_text for marker in SPECIAL_MESSAGE_MARKERS):
+            suppressed = True
+            continue
+
+        # Hold back any tail that could still grow into a marker
+        held_back = 0
+        for marker in SPECIAL_MESSAGE_MARKERS:
+            for length in range(min(len(marker) - 1, len(full_text)), held_back, -1):
+                if full_text.endswith(marker[:length]):
+                    held_back = length
+                    break
+
+        safe_end = len(full_text) - held_back
+        if safe_end > emitted:
+            yield full_text[emitted:safe_end]
+            emitted = safe_end
+
+    if not suppressed and len(full_text) > emitted:
+        yield full_text[emitted:]
+
 def detect_conversation_loop(messages, threshold=3):
     """
     Detect if the conversation is stuck in a loop asking for the same information.
@@ -141,12 +252,10 @@ def add_system_guidance():
         In your next messages, please focus on gathering information about the uncovered sections.
         """
         
-        # Add the guidance as a system message
-        st.session_state.chat_history.append({
-            "role": "system",
-            "content": guidance
-        })
+        # Set the guidance, replacing any earlier progress guidance
+        set_guidance("section_progress", guidance)
         
         return True
     
+    clear_guidance("section_progress")
     return False
\ No newline at end of file
@@ -0,0 +1,330 @@
+"""
+ACME Questionnaire Bot - Topic Coverage
+
+Functions for tracking which sections of the questionnaire the conversation has
+covered. A regular check sends only the exchanges since the previous check
+together with the current coverage and the evidence behind it, so its cost
+stays the same however long the conversation gets. Every few checks a full
+reconciliation over the whole context corrects anything the incremental checks
+got wrong.
+
+Checks are not run after every reply: schedule_coverage_check decides when one
+is worth its call (a new section, a long answer, a summary request, or every
+few turns). Answers to scripted questions need no check at all: a section is
+marked covered from the questionnaire index once all of its questions have
+an answer.
+"""
+import json
+import streamlit as st
+from services.ai_service import get_ai_response
+from services.resilience import AIServiceError
+from utils.file_loader import get_session_questionnaire, get_section_for_question, find_question
+from config import (
+    TOPIC_AREAS, COVERAGE_RECONCILE_EVERY, COVERAGE_EVIDENCE_PER_TOPIC,
+    COVERAGE_EXCHANGE_CHARS, COVERAGE_MAX_EXCHANGES, COVERAGE_SCHEDULING, COVERAGE_ON_SECTION_CHANGE,
+    COVERAGE_LONG_ANSWER_WORDS, COVERAGE_ON_SUMMARY, COVERAGE_CHECK_EVERY
+)
+
+def initialize_coverage_state():
+    """Start with no evidence and no checks for a new session."""
+    st.session_state.topic_evidence = {topic: [] for topic in TOPIC_AREAS}
+    st.session_state.coverage_checks = 0
+    st.session_state.coverage_reconcile_due = False
+    st.session_state.coverage_checked_upto = 0
+    st.session_state.coverage_last_section = None
+    st.session_state.coverage_turns_skipped = 0
+
+def build_section_outline():
+    """
+    List the scripted questions of each section, so the AI knows what each one is about.
+
+    Returns:
+        str: One block per section with its questions
+    """
+    questionnaire = get_session_questionnaire()
+    blocks = []
+    for topic, indexes in questionnaire.section_questions.items():
+        section_questions = "\n".join(f"- {questionnaire.questions[index]}" for index in indexes)
+        blocks.append(f"{topic} ({questionnaire.section_titles[topic]}):\n{section_questions}")
+    return "\n\n".join(blocks)
+
+def shorten(text, limit):
+    """
+    Put text on one line and cut it to a length limit.
+
+    Args:
+        text (str): The text
+        limit (int): Longest length in characters
+
+    Returns:
+        str: The shortened text
+    """
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def get_new_exchanges():
+    """
+    Find the exchanges added to the conversation since the previous check.
+
+    Returns:
+        list: One dict per user message with the assistant message before it ('asked'),
+            the user message ('answered') and the reply to it ('replied')
+    """
+    history = st.session_state.chat_history
+    exchanges = []
+    for position in range(st.session_state.coverage_checked_upto, len(history)):
+        if history[position]["role"] != "user":
+            continue
+        asked = next((message["content"] for message in reversed(history[:position]) if message["role"] == "assistant"), "")
+        replied = next((message["content"] for message in history[position + 1:] if message["role"] == "assistant"), "")
+        exchanges.append({"asked": asked, "answered": history[position]["content"], "replied": replied})
+    return exchanges
+
+def build_delta_messages(exchanges):
+    """
+    Build the messages for an incremental check of the exchanges since the previous check.
+
+    The system message only depends on the questionnaire, so it stays the same
+    for every check and every session.
+
+    Args:
+        exchanges (list): Exchanges from get_new_exchanges, at most COVERAGE_MAX_EXCHANGES
+
+    Returns:
+        list: Messages to send
+    """
+    evidence_lines = [
+        f"- {topic}: " + " | ".join(entries)
+        for topic, entries in st.session_state.topic_evidence.items() if entries
+    ]
+    evidence = "\n".join(evidence_lines) if evidence_lines else "- none yet"
+    exchange_text = "\n\n".join(
+        f"Assistant asked: {shorten(exchange['asked'], COVERAGE_EXCHANGE_CHARS)}\n"
+        f"User answered: {shorten(exchange['answered'], COVERAGE_EXCHANGE_CHARS)}\n"
+        f"Assistant replied: {shorten(exchange['replied'], COVERAGE_EXCHANGE_CHARS)}"
+        for exchange in exchanges
+    )
+
+    return [
+        {
+            "role": "system",
+            "content": "You track which sections of a questionnaire a conversation has covered. "
+                       "A section is covered once the user has given substantive information about it. "
+                       "The sections and their questions are:\n\n" + build_section_outline()
+        },
+        {
+            "role": "user",
+            "content": f"Current coverage: {json.dumps(st.session_state.topic_areas_covered)}\n"
+                       f"Evidence so far:\n{evidence}\n\n"
+                       f"Newest exchanges:\n{exchange_text}\n\n"
+                       "Update the coverage with the newest exchanges. Respond ONLY with a TOPIC_UPDATE message "
+                       "that includes the status of ALL topic areas, for example: "
+                       f"TOPIC_UPDATE: {json.dumps({topic: False for topic in TOPIC_AREAS})}"
+        }
+    ]
+
+def build_reconcile_messages():
+    """
+    Build the messages for a full coverage check over the whole context.
+
+    Returns:
+        list: Messages to send
+    """
+    from utils.context_window import get_context_messages
+
+    return get_context_messages(tail=[{
+        "role": "system",
+        "content": "Based on all conversation so far, which sections have been covered? Respond ONLY with a TOPIC_UPDATE message that includes the status of ALL topic areas."
+    }])
+
+def parse_topic_update(response):
+    """
+    Read the coverage from a TOPIC_UPDATE response.
+
+    Args:
+        response (str): The AI's response
+
+    Returns:
+        dict: Mapping of topic key to covered status for the known topics, or None if there is none
+    """
+    if "TOPIC_UPDATE:" not in response:
+        return None
+    try:
+        updates = json.loads(response.split("TOPIC_UPDATE:", 1)[1].strip().split("\n")[0])
+    except ValueError:
+        return None
+    if not isinstance(updates, dict):
+        return None
+    return {topic: bool(status) for topic, status in updates.items() if topic in TOPIC_AREAS}
+
+def request_coverage(mode, messages):
+    """
+    Ask the AI for the coverage. Does not touch the session state, so it can run on a worker thread.
+
+    Args:
+        mode (str): 'delta' for an incremental check, 'reconcile' for a full one
+        messages (list): Messages from build_delta_messages or build_reconcile_messages
+
+    Returns:
+        dict: Mapping of topic key to covered status, or None if the check failed
+    """
+    purpose = "topic_check" if mode == "delta" else "topic_reconcile"
+    try:
+        return parse_topic_update(get_ai_response(messages, purpose=purpose))
+    except AIServiceError as e:
+        print(f"Topic coverage check skipped: {e}")
+        return None
+
+def record_evidence(topic, exchanges):
+    """
+    Remember the exchange that showed a section is covered, keeping the newest few.
+
+    Prefers the newest exchange about one of the section's own questions.
+
+    Args:
+        topic (str): Topic key
+        exchanges (list): The exchanges the check looked at
+    """
+    questionnaire = get_session_questionnaire()
+    section_questions = [questionnaire.questions[index] for index in questionnaire.section_questions.get(topic, ())]
+    exchange = next(
+        (exchange for exchange in reversed(exchanges) if any(question in exchange["asked"] for question in section_questions)),
+        exchanges[-1]
+    )
+
+    entry = f"Q: {shorten(exchange['asked'], 120)} A: {shorten(exchange['answered'], 160)}"
+    entries = st.session_state.topic_evidence.setdefault(topic, [])
+    entries.append(entry)
+    del entries[:-COVERAGE_EVIDENCE_PER_TOPIC]
+
+def apply_coverage(mode, updates, exchanges=None):
+    """
+    Merge a coverage result into the session.
+
+    An incremental check can only mark sections as covered; only a full
+    reconciliation can take coverage back.
+
+    Args:
+        mode (str): 'delta' or 'reconcile'
+        updates (dict): Result from request_coverage, None if the check failed
+        exchanges (list): The exchanges an incremental check looked at
+    """
+    from utils.special_messages import apply_topic_updates
+
+    if updates is None:
+        # Whatever this check missed, the next one goes over the whole conversation
+        st.session_state.coverage_reconcile_due = True
+        return
+
+    covered = st.session_state.topic_areas_covered
+    if mode == "delta":
+        for topic, status in updates.items():
+            if status and not covered.get(topic):
+                record_evidence(topic, exchanges)
+        updates = {topic: True for topic, status in updates.items() if status}
+    else:
+        for topic, status in updates.items():
+            if not status:
+                st.session_state.topic_evidence[topic] = []
+
+    apply_topic_updates(updates)
+
+def record_scripted_answer(question_index):
+    """
+    Mark a section covered without a model call once all of its scripted questions have an answer.
+
+    Args:
+        question_index (int): Index of the question just answered
+    """
+    from utils.special_messages import apply_topic_updates
+
+    questionnaire = get_session_questionnaire()
+    section = get_section_for_question(question_index, questionnaire)
+    if section is None or st.session_state.topic_areas_covered.get(section, True):
+        return
+
+    answered = {find_question(question, questionnaire) for question, _ in st.session_state.responses}
+    if all(index in answered for index in questionnaire.section_questions[section]):
+        print(f"All questions of {section} answered, marking it covered")
+        apply_topic_updates({section: True})
+
+def plan_coverage_check():
+    """
+    Decide between an incremental check and a full reconciliation and build its request.
+
+    Returns:
+        tuple: (mode, messages, exchanges), or None if there is nothing to check
+    """
+    if "coverage_checked_upto" not in st.session_state:
+        # Sessions restored from before coverage was tracked incrementally
+        initialize_coverage_state()
+        st.session_state.coverage_reconcile_due = True
+    if st.session_state.coverage_checked_upto > len(st.session_state.chat_history):
+        # The history was replaced, e.g. by loading a saved session
+        st.session_state.coverage_checked_upto = 0
+        st.session_state.coverage_reconcile_due = True
+
+    exchanges = get_new_exchanges()
+    if not exchanges:
+        return None
+
+    st.session_state.coverage_checks += 1
+    st.session_state.coverage_checked_upto = len(st.session_state.chat_history)
+
+    reconcile_due = COVERAGE_RECONCILE_EVERY and st.session_state.coverage_checks % COVERAGE_RECONCILE_EVERY == 0
+    if reconcile_due or st.session_state.coverage_reconcile_due or len(exchanges) > COVERAGE_MAX_EXCHANGES:
+        st.session_state.coverage_reconcile_due = False
+        return "reconcile", build_reconcile_messages(), exchanges
+    return "delta", build_delta_messages(exchanges), exchanges
+
+def schedule_coverage_check(user_input):
+    """
+    Decide whether a coverage check is worth running after this turn, and log the decision.
+
+    Args:
+        user_input (str): The user's latest message
+
+    Returns:
+        bool: True if a check should run now
+    """
+    if "coverage_checked_upto" not in st.session_state:
+        initialize_coverage_state()
+
+    question_index = st.session_state.current_question_index
+    section = get_section_for_question(question_index, get_session_questionnaire())
+
+    reason = None
+    if not COVERAGE_SCHEDULING:
+        reason = "scheduling disabled"
+    elif COVERAGE_ON_SUMMARY and (
+        "summary" in user_input.lower() or st.session_state.get("summary_requested")
+        or "summary_blocked" in st.session_state.get("guidance", {})
+    ):
+        reason = "summary requested"
+    elif COVERAGE_ON_SECTION_CHANGE and section != st.session_state.coverage_last_section:
+        reason = f"section changed to {section}"
+    elif question_index >= len(st.session_state.questions) - 1:
+        reason = "last question"
+    elif COVERAGE_LONG_ANSWER_WORDS and len(user_input.split()) >= COVERAGE_LONG_ANSWER_WORDS:
+        reason = "long answer"
+    elif COVERAGE_CHECK_EVERY and st.session_state.coverage_turns_skipped + 1 >= COVERAGE_CHECK_EVERY:
+        reason = f"{COVERAGE_CHECK_EVERY} turns since the last check"
+
+    if reason is None:
+        st.session_state.coverage_turns_skipped += 1
+        print(f"Coverage check skipped at question {question_index} ({st.session_state.coverage_turns_skipped} turns since the last check)")
+        return False
+
+    st.session_state.coverage_turns_skipped = 0
+    st.session_state.coverage_last_section = section
+    print(f"Coverage check scheduled at question {question_index}: {reason}")
+    return True
+
+def update_topic_coverage():
+    """Check the exchanges since the previous check, or the whole conversation every few checks, and update the coverage."""
+    plan = plan_coverage_check()
+    if plan is None:
+        return
+
+    mode, messages, exchanges = plan
+    apply_coverage(mode, request_coverage(mode, messages), exchanges)